@@ -8,24 +8,47 @@ import time
 import uuid
 import urllib.request
 import socket
+import sys
 import json
+import wave
+import math
+import os
+import queue
+import threading
+from bisect import bisect_left
 from collections import deque
-from dataclasses import dataclass
+from contextlib import ExitStack, redirect_stdout
+from dataclasses import dataclass, replace
 from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from typing import Optional
 
 import numpy as np
-import sounddevice as sd
-from scipy.signal import resample_poly
+from scipy.signal import firwin, upfirdn
 import requests
-from tflite_runtime.interpreter import Interpreter
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
 
 LABELS_URL_DEFAULT = "https://raw.githubusercontent.com/tensorflow/models/master/research/audioset/yamnet/yamnet_class_map.csv"
 
+SCORE_WEIGHTS_DEFAULT = "Bark: 1.0; Dog: 0.90; Domestic animals, pets: 0.60; Animal: 0.40"
+SUPPRESS_DEFAULT = "Silence"
+
 @dataclass
 class Cfg:
     model_path: str
+    model_variant: str
+    model_path_float16: str
+    model_path_int8: str
+    head_path: str
+    head_weight: float
+    num_threads: int
+    delegate: str
+    warmup_runs: int
+    throttle_factor: float
     dog_id: str
     webhook_url_template: str
 
@@ -35,10 +58,20 @@ class Cfg:
     target_sr: int
     frame_len: int
     block_sec: float
+    queue_blocks: int
 
     thresh: float
     debounce_k: int
     debounce_n: int
+    idle_stride_sec: float
+    score_weights: tuple
+    suppress_classes: tuple
+
+    gate_enabled: bool
+    gate_floor_db: float
+    gate_hysteresis_db: float
+    gate_flux: float
+    gate_hold_sec: float
 
     heartbeat_sec: float
     bark_end_sec: float
@@ -46,13 +79,88 @@ class Cfg:
 
     http_timeout: float
     user_agent: str
+    queue_size: int
+    pool_size: int
+    keep_alive: bool
+    http_retries: int
+    http_backoff: float
 
     labels_url: str
+    labels_path: str
     send_session_fields: bool
     print_only_hits: bool
     heartbeat_url_template: str
     api_token: str
     heartbeat_state_path: str
+    outbox_path: str
+    batch_url_template: str
+    batch_size: int
+    outbox_max_events: int
+    retry_min_sec: float
+    retry_max_sec: float
+    metrics_port: int = 0
+    metrics_bind: str = "127.0.0.1"
+    metrics_textfile: str = ""
+    metrics_interval_sec: float = 15.0
+    log_format: str = "text"
+    log_summary_sec: float = 1.0
+    log_detail_sec: float = 2.0
+    calibration_path: str = ""
+    calibration_sec: float = 60.0
+    target_floor_db: float = -50.0
+    agc_enabled: bool = False
+    agc_min_gain: float = 0.5
+    agc_max_gain: float = 20.0
+    agc_rise_sec: float = 30.0
+    agc_fall_sec: float = 2.0
+    agc_slew_db: float = 0.5
+    clips_enabled: bool = False
+    clips_dir: str = ""
+    clips_format: str = "wav"
+    clips_pre_sec: float = 5.0
+    clips_post_sec: float = 3.0
+    clips_max_sec: float = 120.0
+    clips_max_mb: float = 200.0
+    clips_max_age_days: float = 7.0
+    streams: tuple = ()
+    stream_name: str = ""
+    explicit: tuple = ()
+    calibrated: tuple = ()
+
+# Cfg fields --calibrate can set and the config.ini option that takes precedence
+CALIBRATED_KEYS = {
+    "mic_gain": ("audio", "mic_gain"),
+    "thresh": ("detect", "thresh"),
+}
+
+# [stream.<name>] keys and the Cfg field / type each one overrides
+STREAM_KEYS = {
+    "dog_id": ("dog_id", str),
+    "input_device": ("input_device", int),
+    "mic_gain": ("mic_gain", float),
+    "thresh": ("thresh", float),
+    "debounce_k": ("debounce_k", int),
+    "debounce_n": ("debounce_n", int),
+    "api_token": ("api_token", str),
+}
+
+def parse_class_list(value: str) -> list:
+    # one class per line or ";"-separated (YAMNet names contain commas)
+    items = []
+    for line in value.replace(";", "\n").splitlines():
+        line = line.strip()
+        if line:
+            items.append(line)
+    return items
+
+def parse_class_weights(value: str) -> tuple:
+    weights = []
+    for item in parse_class_list(value):
+        name, sep, w = item.rpartition(":")
+        if not sep or not name.strip():
+            raise ValueError(f"Expected 'Class name: weight', got {item!r}")
+        weights.append((name.strip(), float(w)))
+    return tuple(weights)
 
 def load_config(path: str) -> Cfg:
     p = Path(path).expanduser()
@@ -68,15 +176,36 @@ def load_config(path: str) -> Cfg:
     dog_id = req("barksignal", "dog_id")
     webhook_url_template = req("barksignal", "webhook_url_template")
 
+    model_variant = cp.get("model", "variant", fallback="float").strip().lower()
+    model_path_float16 = cp.get("model", "float16_path", fallback="").strip()
+    model_path_int8 = cp.get("model", "int8_path", fallback="").strip()
+    head_path = cp.get("model", "head_path", fallback="").strip()
+    head_weight = float(cp.get("model", "head_weight", fallback="1.0"))
+    num_threads = int(cp.get("model", "num_threads", fallback="0"))
+    delegate = cp.get("model", "delegate", fallback="xnnpack").strip()
+    warmup_runs = int(cp.get("model", "warmup_runs", fallback="10"))
+    throttle_factor = float(cp.get("model", "throttle_factor", fallback="1.5"))
+
     input_device = int(cp.get("audio", "input_device", fallback="1"))
     mic_gain = float(cp.get("audio", "mic_gain", fallback="1.0"))
     target_sr = int(cp.get("audio", "target_sr", fallback="16000"))
     frame_len = int(cp.get("audio", "frame_len", fallback="15600"))
     block_sec = float(cp.get("audio", "block_sec", fallback="0.25"))
+    queue_blocks = int(cp.get("audio", "queue_blocks", fallback="16"))
 
     thresh = float(cp.get("detect", "thresh", fallback="0.30"))
     debounce_k = int(cp.get("detect", "debounce_k", fallback="2"))
     debounce_n = int(cp.get("detect", "debounce_n", fallback="3"))
+    # while idle, infer only every idle_stride_sec (0 = every block)
+    idle_stride_sec = float(cp.get("detect", "idle_stride_sec", fallback="0.75"))
+    score_weights = parse_class_weights(cp.get("scoring", "weights", fallback=SCORE_WEIGHTS_DEFAULT))
+    suppress_classes = tuple(parse_class_list(cp.get("scoring", "suppress", fallback=SUPPRESS_DEFAULT)))
+
+    gate_enabled = cp.getboolean("gate", "enabled", fallback=False)
+    gate_floor_db = float(cp.get("gate", "floor_db", fallback="-55.0"))
+    gate_hysteresis_db = float(cp.get("gate", "hysteresis_db", fallback="6.0"))
+    gate_flux = float(cp.get("gate", "flux", fallback="1.5"))
+    gate_hold_sec = float(cp.get("gate", "hold_sec", fallback="2.0"))
 
     heartbeat_sec = float(cp.get("session", "heartbeat_sec", fallback="20.0"))
     bark_end_sec = float(cp.get("session", "bark_end_sec", fallback="3.0"))
@@ -84,11 +213,27 @@ def load_config(path: str) -> Cfg:
 
     http_timeout = float(cp.get("http", "timeout_sec", fallback="3.0"))
     user_agent = cp.get("http", "user_agent", fallback="BarkSignal-YAMNet-RPi/1.0")
+    queue_size = int(cp.get("http", "queue_size", fallback="256"))
+    pool_size = int(cp.get("http", "pool_size", fallback="2"))
+    keep_alive = cp.getboolean("http", "keep_alive", fallback=True)
+    http_retries = int(cp.get("http", "retries", fallback="2"))
+    http_backoff = float(cp.get("http", "backoff_factor", fallback="0.5"))
 
     labels_url = cp.get("yamnet", "labels_url", fallback=LABELS_URL_DEFAULT)
+    model_file = Path(model_path).expanduser()
+    labels_path = cp.get(
+        "yamnet",
+        "labels_path",
+        fallback=str(model_file.with_name(f"{model_file.stem}_class_map.csv")),
+    ).strip()
 
     send_session_fields = cp.getboolean("barksignal", "send_session_fields", fallback=False)
     print_only_hits = cp.getboolean("debug", "print_only_hits", fallback=False)
+    log_format = cp.get("debug", "log_format", fallback="text").strip().lower()
+    if log_format not in ("text", "json"):
+        raise ValueError(f"[debug] log_format must be text or json, got {log_format!r}")
+    log_summary_sec = float(cp.get("debug", "summary_sec", fallback="1.0"))
+    log_detail_sec = float(cp.get("debug", "detail_sec", fallback="2.0"))
     heartbeat_url_template = cp.get(
         "heartbeat",
         "url",
@@ -100,9 +245,80 @@ def load_config(path: str) -> Cfg:
         "state_path",
         fallback="/home/barksignal/barksignal-data/last_heartbeat.json",
     ).strip()
+    outbox_path = cp.get(
+        "outbox",
+        "path",
+        fallback=str(Path(heartbeat_state_path or "/home/barksignal/barksignal-data/last_heartbeat.json").parent / "outbox.jsonl"),
+    ).strip()
+    batch_url_template = cp.get("outbox", "batch_url", fallback="").strip()
+    batch_size = int(cp.get("outbox", "batch_size", fallback="50"))
+    outbox_max_events = int(cp.get("outbox", "max_events", fallback="10000"))
+    retry_min_sec = float(cp.get("outbox", "retry_min_sec", fallback="5.0"))
+    retry_max_sec = float(cp.get("outbox", "retry_max_sec", fallback="300.0"))
+
+    calibration_path = cp.get(
+        "calibration",
+        "path",
+        fallback=str(Path(heartbeat_state_path or "/home/barksignal/barksignal-data/last_heartbeat.json").parent / "calibration.json"),
+    ).strip()
+    calibration_sec = float(cp.get("calibration", "duration_sec", fallback="60"))
+    target_floor_db = float(cp.get("calibration", "target_floor_db", fallback="-50.0"))
+    agc_enabled = cp.getboolean("agc", "enabled", fallback=False)
+    agc_min_gain = float(cp.get("agc", "min_gain", fallback="0.5"))
+    agc_max_gain = float(cp.get("agc", "max_gain", fallback="20.0"))
+    agc_rise_sec = float(cp.get("agc", "rise_sec", fallback="30.0"))
+    agc_fall_sec = float(cp.get("agc", "fall_sec", fallback="2.0"))
+    agc_slew_db = float(cp.get("agc", "slew_db_per_sec", fallback="0.5"))
+
+    clips_enabled = cp.getboolean("clips", "enabled", fallback=False)
+    clips_dir = cp.get(
+        "clips",
+        "dir",
+        fallback=str(Path(heartbeat_state_path or "/home/barksignal/barksignal-data/last_heartbeat.json").parent / "clips"),
+    ).strip()
+    clips_format = cp.get("clips", "format", fallback="wav").strip().lower()
+    if clips_format not in ("wav", "flac"):
+        raise ValueError(f"[clips] format must be wav or flac, got {clips_format!r}")
+    clips_pre_sec = float(cp.get("clips", "pre_sec", fallback="5.0"))
+    clips_post_sec = float(cp.get("clips", "post_sec", fallback="3.0"))
+    clips_max_sec = float(cp.get("clips", "max_sec", fallback="120.0"))
+    clips_max_mb = float(cp.get("clips", "max_mb", fallback="200"))
+    clips_max_age_days = float(cp.get("clips", "max_age_days", fallback="7"))
+
+    metrics_port = int(cp.get("metrics", "port", fallback="0"))
+    metrics_bind = cp.get("metrics", "bind", fallback="127.0.0.1").strip()
+    metrics_textfile = cp.get("metrics", "textfile", fallback="").strip()
+    metrics_interval_sec = float(cp.get("metrics", "interval_sec", fallback="15.0"))
+
+    streams = []
+    for section in cp.sections():
+        if not section.startswith("stream."):
+            continue
+        name = section[len("stream."):].strip()
+        overrides = {}
+        for key, value in cp.items(section, raw=True):
+            if key in cp.defaults():
+                continue
+            if key not in STREAM_KEYS:
+                raise KeyError(f"Unknown key {key!r} in [{section}] of {p}, expected one of {sorted(STREAM_KEYS)}")
+            field, conv = STREAM_KEYS[key]
+            overrides[field] = conv(value.strip())
+        if "dog_id" not in overrides:
+            raise KeyError(f"Missing [{section}] dog_id in {p}")
+        streams.append((name, overrides))
+    explicit = tuple(field for field, (section, key) in CALIBRATED_KEYS.items() if cp.has_option(section, key))
 
     return Cfg(
         model_path=model_path,
+        model_variant=model_variant,
+        model_path_float16=model_path_float16,
+        model_path_int8=model_path_int8,
+        head_path=head_path,
+        head_weight=head_weight,
+        num_threads=num_threads,
+        delegate=delegate,
+        warmup_runs=warmup_runs,
+        throttle_factor=throttle_factor,
         dog_id=dog_id,
         webhook_url_template=webhook_url_template,
         input_device=input_device,
@@ -110,31 +326,653 @@ def load_config(path: str) -> Cfg:
         target_sr=target_sr,
         frame_len=frame_len,
         block_sec=block_sec,
+        queue_blocks=queue_blocks,
         thresh=thresh,
         debounce_k=debounce_k,
         debounce_n=debounce_n,
+        idle_stride_sec=idle_stride_sec,
+        score_weights=score_weights,
+        suppress_classes=suppress_classes,
+        gate_enabled=gate_enabled,
+        gate_floor_db=gate_floor_db,
+        gate_hysteresis_db=gate_hysteresis_db,
+        gate_flux=gate_flux,
+        gate_hold_sec=gate_hold_sec,
         heartbeat_sec=heartbeat_sec,
         bark_end_sec=bark_end_sec,
         status_heartbeat_sec=status_heartbeat_sec,
         http_timeout=http_timeout,
         user_agent=user_agent,
+        queue_size=queue_size,
+        pool_size=pool_size,
+        keep_alive=keep_alive,
+        http_retries=http_retries,
+        http_backoff=http_backoff,
         labels_url=labels_url,
+        labels_path=labels_path,
         send_session_fields=send_session_fields,
         print_only_hits=print_only_hits,
         heartbeat_url_template=heartbeat_url_template,
         api_token=api_token,
         heartbeat_state_path=heartbeat_state_path,
+        outbox_path=outbox_path,
+        batch_url_template=batch_url_template,
+        batch_size=batch_size,
+        outbox_max_events=outbox_max_events,
+        retry_min_sec=retry_min_sec,
+        retry_max_sec=retry_max_sec,
+        metrics_port=metrics_port,
+        metrics_bind=metrics_bind,
+        metrics_textfile=metrics_textfile,
+        metrics_interval_sec=metrics_interval_sec,
+        log_format=log_format,
+        log_summary_sec=log_summary_sec,
+        log_detail_sec=log_detail_sec,
+        calibration_path=calibration_path,
+        calibration_sec=calibration_sec,
+        target_floor_db=target_floor_db,
+        agc_enabled=agc_enabled,
+        agc_min_gain=agc_min_gain,
+        agc_max_gain=agc_max_gain,
+        agc_rise_sec=agc_rise_sec,
+        agc_fall_sec=agc_fall_sec,
+        agc_slew_db=agc_slew_db,
+        clips_enabled=clips_enabled,
+        clips_dir=clips_dir,
+        clips_format=clips_format,
+        clips_pre_sec=clips_pre_sec,
+        clips_post_sec=clips_post_sec,
+        clips_max_sec=clips_max_sec,
+        clips_max_mb=clips_max_mb,
+        clips_max_age_days=clips_max_age_days,
+        streams=tuple(streams),
+        explicit=explicit,
     )
 
-def load_labels(labels_url: str):
-    with urllib.request.urlopen(labels_url) as r:
-        text = r.read().decode("utf-8")
+def stream_cfgs(cfg: Cfg) -> list:
+    """One Cfg per [stream.X] section, or just ``cfg`` when there are none."""
+    if not cfg.streams:
+        return [cfg]
+    out = []
+    for name, overrides in cfg.streams:
+        outbox_path = cfg.outbox_path
+        if outbox_path:
+            p = Path(outbox_path)
+            outbox_path = str(p.with_name(f"{p.stem}-{name}{p.suffix}"))
+        scfg = replace(cfg, stream_name=name, outbox_path=outbox_path, streams=(), **overrides)
+        # calibrated values beat built-in defaults; anything set in config.ini
+        # (shared or in the stream section) beats calibration
+        calibrated = {k: v for k, v in calibration_for(scfg).items() if k not in overrides}
+        out.append(replace(scfg, calibrated=tuple(calibrated), **calibrated))
+    return out
+
+def load_calibration(cfg: Cfg) -> dict:
+    p = Path(cfg.calibration_path).expanduser() if cfg.calibration_path else None
+    if p is None or not p.exists():
+        return {}
+    try:
+        return json.loads(p.read_text(encoding="utf-8")).get("streams", {})
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"⚠️  ignoring calibration {p}: {e}", file=sys.stderr)
+        return {}
+
+def calibration_for(cfg: Cfg) -> dict:
+    """mic_gain / thresh recorded by --calibrate for this stream and input device.
+
+    Keys set explicitly in config.ini are left out, so hand-tuning after a
+    calibration run takes effect.
+    """
+    entry = load_calibration(cfg).get(cfg.stream_name)
+    if not entry or entry.get("input_device") != cfg.input_device:
+        return {}
+    return {k: float(entry[k]) for k in CALIBRATED_KEYS if k not in cfg.explicit}
+
+def parse_labels(text: str) -> list:
     rows = list(csv.DictReader(io.StringIO(text)))
     labels = [row["display_name"] for row in rows]
     if len(labels) != 521:
         raise RuntimeError(f"Expected 521 labels, got {len(labels)}")
     return labels
 
+def load_labels(labels_url: str, labels_path: str="", *, timeout: float=10.0):
+    p = Path(labels_path).expanduser() if labels_path else None
+    if p is not None and p.exists():
+        return parse_labels(p.read_text(encoding="utf-8"))
+    try:
+        with urllib.request.urlopen(labels_url, timeout=timeout) as r:
+            text = r.read().decode("utf-8")
+    except Exception as e:
+        where = f" and {p} does not exist" if p is not None else ""
+        raise RuntimeError(f"Cannot load YAMNet labels: download from {labels_url} failed ({e}){where}")
+    labels = parse_labels(text)
+    if p is not None:
+        try:
+            p.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(p, text)
+        except OSError:
+            pass
+    return labels
+
+@dataclass(frozen=True)
+class LabelIndex:
+    names: tuple
+    ids: dict
+
+    @classmethod
+    def from_labels(cls, labels: list) -> "LabelIndex":
+        return cls(names=tuple(labels), ids={name: i for i, name in enumerate(labels)})
+
+    def lookup(self, name: str) -> int:
+        try:
+            return self.ids[name]
+        except KeyError:
+            raise KeyError(f"Unknown YAMNet class {name!r}") from None
+
+class Scorer:
+    """Weighted max over a few YAMNet classes, gated by suppression classes.
+
+    ``signal = max(w_i * scores[c_i])``; a frame is suppressed when the
+    top-scoring class overall is one of the suppression classes (by default
+    Silence). Indices and weights are resolved once; ``score`` only does a
+    gather, a multiply and two max reductions into preallocated buffers.
+    """
+
+    __slots__ = ("names", "_idx", "_w", "_buf", "_sup", "_sup_buf")
+
+    def __init__(self, idx: LabelIndex, weights, suppress=()):
+        if not weights:
+            raise ValueError("[scoring] weights must list at least one class")
+        self.names = tuple(name for name, _ in weights)
+        self._idx = np.array([idx.lookup(name) for name, _ in weights], dtype=np.intp)
+        self._w = np.array([w for _, w in weights], dtype=np.float32)
+        self._buf = np.empty(len(self._idx), dtype=np.float32)
+        self._sup = np.array([idx.lookup(name) for name in suppress], dtype=np.intp)
+        self._sup_buf = np.empty(len(self._sup), dtype=np.float32)
+
+    @classmethod
+    def from_cfg(cls, cfg: Cfg, idx: LabelIndex) -> "Scorer":
+        return cls(idx, cfg.score_weights, cfg.suppress_classes)
+
+    def score(self, scores: np.ndarray) -> tuple:
+        np.take(scores, self._idx, out=self._buf)
+        np.multiply(self._buf, self._w, out=self._buf)
+        signal = float(self._buf.max())
+        suppressed = False
+        if len(self._sup):
+            np.take(scores, self._sup, out=self._sup_buf)
+            suppressed = bool(self._sup_buf.max() >= scores.max())
+        return signal, suppressed
+
+    def describe(self, scores: np.ndarray) -> str:
+        return " ".join(f"{name}={float(scores[i]):.3f}" for name, i in zip(self.names, self._idx))
+
+class RingBuffer:
+    """Sliding window over the newest ``size`` samples without per-write allocations.
+
+    Samples are stored twice in a buffer of length ``2 * size`` so the current
+    window is always one contiguous slice; ``view()`` returns it without copying.
+    """
+
+    __slots__ = ("size", "_buf", "_pos")
+
+    def __init__(self, size: int, dtype=np.float32):
+        self.size = int(size)
+        self._buf = np.zeros(2 * self.size, dtype=dtype)
+        self._pos = 0
+
+    def write(self, x: np.ndarray) -> None:
+        size = self.size
+        n = len(x)
+        if n >= size:
+            x = x[-size:]
+            self._buf[:size] = x
+            self._buf[size:] = x
+            self._pos = 0
+            return
+        p = self._pos
+        first = min(n, size - p)
+        self._buf[p:p + first] = x[:first]
+        self._buf[p + size:p + size + first] = x[:first]
+        rest = n - first
+        if rest:
+            self._buf[:rest] = x[first:]
+            self._buf[size:size + rest] = x[first:]
+        self._pos = (p + n) % size
+
+    def view(self, length: Optional[int]=None, back: int=0) -> np.ndarray:
+        """Contiguous window of ``length`` samples ending ``back`` samples before the newest."""
+        end = self._pos + self.size - back
+        if length is None:
+            length = self.size - back
+        return self._buf[end - length:end]
+
+    def clear(self) -> None:
+        self._buf.fill(0)
+        self._pos = 0
+
+class StreamResampler:
+    """Polyphase resampler that keeps filter state across blocks.
+
+    Uses the same Kaiser-windowed FIR as ``scipy.signal.resample_poly`` but
+    designs it once and carries enough past input over to the next block, so
+    consecutive blocks are filtered exactly as if they were one long signal (no
+    seams at block boundaries). The output has a constant delay of
+    ``half_len / up`` input samples (under 1 ms for the usual rates).
+    """
+
+    __slots__ = ("up", "down", "block_len", "_h", "_hist", "_linv", "_buf", "_t")
+
+    def __init__(self, in_sr: int, out_sr: int, block_len: int, window=("kaiser", 5.0)):
+        g = math.gcd(int(in_sr), int(out_sr))
+        self.up = int(out_sr) // g
+        self.down = int(in_sr) // g
+        self.block_len = int(block_len)
+        max_rate = max(self.up, self.down)
+        if max_rate == 1:
+            self._h = np.ones(1, dtype=np.float32)
+        else:
+            half_len = 10 * max_rate
+            self._h = (firwin(2 * half_len + 1, 1.0 / max_rate, window=window) * self.up).astype(np.float32)
+        taps = -(-len(self._h) // self.up)
+        # history long enough for the filter plus up to down-1 samples of slack,
+        # so the first needed output always lands on a whole upfirdn output index
+        self._hist = taps + self.down - 1
+        self._linv = pow(self.up, -1, self.down) if self.down > 1 else 0
+        self._buf = np.zeros(self._hist + self.block_len, dtype=np.float32)
+        # position of the next output sample in the upsampled domain, relative to
+        # the first sample of the next block
+        self._t = 0
+
+    @property
+    def passthrough(self) -> bool:
+        return self.up == self.down == 1
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        n = len(x)
+        hist = self._hist
+        if n == self.block_len:
+            buf = self._buf
+        else:
+            buf = np.empty(hist + n, dtype=np.float32)
+            buf[:hist] = self._buf[:hist]
+        buf[hist:] = x
+        t = self._t
+        start = (hist + t * self._linv) % self.down
+        k0 = ((hist - start) * self.up + t) // self.down
+        count = max(0, -(-(n * self.up - t) // self.down))
+        y = upfirdn(self._h, buf[start:], self.up, self.down)[k0:k0 + count]
+        self._t = t + count * self.down - n * self.up
+        self._buf[:hist] = buf[n:n + hist]
+        return y
+
+class BlockQueue:
+    """Preallocated single-producer/single-consumer queue of capture blocks.
+
+    The PortAudio callback copies each block into a free slot and never blocks;
+    when the consumer falls behind by ``nslots`` blocks new audio is dropped and
+    counted. The consumer processes the slot returned by ``get()`` in place and
+    hands it back with ``release()``.
+    """
+
+    __slots__ = (
+        "nslots", "_slots", "_stamps", "_head", "_tail", "_ready",
+        "overflows", "underflows", "dropped", "captured", "max_depth", "last_lag", "last_stamp",
+    )
+
+    def __init__(self, nslots: int, block_len: int, ready: Optional[threading.Event]=None):
+        self.nslots = max(2, int(nslots))
+        self._slots = np.zeros((self.nslots, block_len), dtype=np.float32)
+        self._stamps = np.zeros(self.nslots, dtype=np.float64)
+        self._head = 0
+        self._tail = 0
+        # may be shared between queues so one consumer can wait on several inputs
+        self._ready = ready or threading.Event()
+        self.overflows = 0
+        self.underflows = 0
+        self.dropped = 0
+        self.captured = 0
+        self.max_depth = 0
+        self.last_lag = 0.0
+        self.last_stamp = 0.0
+
+    @property
+    def depth(self) -> int:
+        return self._head - self._tail
+
+    def callback(self, indata, frames, time_info, status) -> None:
+        if status:
+            if status.input_overflow:
+                self.overflows += 1
+            if status.input_underflow:
+                self.underflows += 1
+        self.push(indata[:, 0], time.monotonic())
+
+    def push(self, block: np.ndarray, stamp: float) -> bool:
+        depth = self._head - self._tail
+        if depth >= self.nslots:
+            self.dropped += 1
+            return False
+        i = self._head % self.nslots
+        slot = self._slots[i]
+        n = min(len(block), len(slot))
+        slot[:n] = block[:n]
+        if n < len(slot):
+            slot[n:] = 0.0
+        self._stamps[i] = stamp
+        self._head += 1
+        self.captured += 1
+        if depth + 1 > self.max_depth:
+            self.max_depth = depth + 1
+        self._ready.set()
+        return True
+
+    def get(self, timeout: Optional[float]=None) -> Optional[np.ndarray]:
+        while self._head == self._tail:
+            self._ready.clear()
+            if self._head != self._tail:
+                break
+            if not self._ready.wait(timeout):
+                return None
+        i = self._tail % self.nslots
+        self.last_stamp = float(self._stamps[i])
+        self.last_lag = time.monotonic() - self.last_stamp
+        return self._slots[i]
+
+    def release(self) -> None:
+        self._tail += 1
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "lag_sec": round(self.last_lag, 3),
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "overflows": self.overflows,
+            "underflows": self.underflows,
+        }
+
+class EnergyGate:
+    """Cheap pre-gate that lets inference be skipped while the room is quiet.
+
+    Opens when the block RMS reaches ``floor_db`` (dBFS), or when the spectral
+    flux against the previous block (relative increase of band magnitudes)
+    reaches ``flux`` while the level is at least ``floor_db - hysteresis_db``.
+    Stays open while the level is above ``floor_db - hysteresis_db`` and for
+    ``hold_sec`` after it drops below.
+    """
+
+    __slots__ = (
+        "open_db", "close_db", "flux_thresh", "hold_blocks", "is_open", "_quiet",
+        "_bands", "_edges", "rms_db", "flux", "blocks", "skipped",
+    )
+
+    def __init__(self, floor_db: float, hysteresis_db: float, flux: float, hold_sec: float, block_sec: float, nbands: int=32):
+        self.open_db = floor_db
+        self.close_db = floor_db - abs(hysteresis_db)
+        self.flux_thresh = flux
+        self.hold_blocks = max(1, int(round(hold_sec / max(block_sec, 1e-6))))
+        self.is_open = True
+        self._quiet = 0
+        self._bands = None
+        self._edges = None
+        self.rms_db = 0.0
+        self.flux = 0.0
+        self.blocks = 0
+        self.skipped = 0
+
+    @classmethod
+    def from_cfg(cls, cfg: Cfg) -> Optional["EnergyGate"]:
+        if not cfg.gate_enabled:
+            return None
+        return cls(cfg.gate_floor_db, cfg.gate_hysteresis_db, cfg.gate_flux, cfg.gate_hold_sec, cfg.block_sec)
+
+    def update(self, block: np.ndarray) -> bool:
+        n = len(block)
+        if n == 0:
+            return self.is_open
+        energy = float(np.dot(block, block)) / n
+        self.rms_db = 10.0 * math.log10(energy + 1e-12)
+
+        mag = np.abs(np.fft.rfft(block))
+        if self._edges is None or self._edges[-1] >= len(mag):
+            self._edges = np.unique(np.linspace(0, len(mag) - 1, 33).astype(np.intp)[:-1])
+        bands = np.add.reduceat(mag, self._edges)
+        if self._bands is None or len(self._bands) != len(bands):
+            self.flux = 0.0
+        else:
+            self.flux = float(np.maximum(bands - self._bands, 0.0).sum() / (self._bands.sum() + 1e-9))
+        self._bands = bands
+
+        if self.is_open:
+            if self.rms_db >= self.close_db:
+                self._quiet = 0
+            else:
+                self._quiet += 1
+                if self._quiet >= self.hold_blocks:
+                    self.is_open = False
+        elif self.rms_db >= self.open_db or (self.flux >= self.flux_thresh and self.rms_db >= self.close_db):
+            self.is_open = True
+            self._quiet = 0
+        return self.is_open
+
+    def stats(self) -> dict:
+        return {
+            "open": self.is_open,
+            "rms_db": round(self.rms_db, 1),
+            "blocks": self.blocks,
+            "skipped": self.skipped,
+            "skipped_pct": round(100.0 * self.skipped / max(1, self.blocks), 1),
+        }
+
+class AutoGain:
+    """Slow automatic gain control that keeps the noise floor at ``target_db``.
+
+    The floor is tracked per block from the RMS level before gain: it follows
+    drops within ``fall_sec`` and rises only over ``rise_sec``, so barks barely
+    move it. The gain moves towards ``target_db - floor`` by at most
+    ``slew_db`` per second, stays within [min_gain, max_gain] and is frozen
+    while a session is open. Blocks are scaled and clipped in place.
+    """
+
+    __slots__ = ("gain", "target_db", "min_db", "max_db", "floor_db", "_rise", "_fall", "_step_db", "_gain_db")
+
+    def __init__(self, gain: float, target_db: float, *, min_gain: float, max_gain: float, rise_sec: float, fall_sec: float, slew_db: float, block_sec: float):
+        self.gain = gain
+        self._gain_db = 20.0 * math.log10(max(gain, 1e-6))
+        self.target_db = target_db
+        self.min_db = 20.0 * math.log10(max(min_gain, 1e-6))
+        self.max_db = 20.0 * math.log10(max(max_gain, 1e-6))
+        self.floor_db = None
+        self._rise = 1.0 - math.exp(-block_sec / max(rise_sec, block_sec))
+        self._fall = 1.0 - math.exp(-block_sec / max(fall_sec, block_sec))
+        self._step_db = slew_db * block_sec
+
+    @classmethod
+    def from_cfg(cls, cfg: Cfg) -> Optional["AutoGain"]:
+        if not cfg.agc_enabled:
+            return None
+        return cls(
+            cfg.mic_gain, cfg.target_floor_db,
+            min_gain=cfg.agc_min_gain, max_gain=cfg.agc_max_gain,
+            rise_sec=cfg.agc_rise_sec, fall_sec=cfg.agc_fall_sec,
+            slew_db=cfg.agc_slew_db, block_sec=cfg.block_sec,
+        )
+
+    def process(self, audio: np.ndarray, frozen: bool=False) -> None:
+        n = len(audio)
+        if n and not frozen:
+            level_db = 10.0 * math.log10(float(np.dot(audio, audio)) / n + 1e-12)
+            if self.floor_db is None:
+                self.floor_db = level_db
+            else:
+                k = self._fall if level_db < self.floor_db else self._rise
+                self.floor_db += k * (level_db - self.floor_db)
+            want = min(self.max_db, max(self.min_db, self.target_db - self.floor_db))
+            step = max(-self._step_db, min(self._step_db, want - self._gain_db))
+            if step:
+                self._gain_db += step
+                self.gain = 10.0 ** (self._gain_db / 20.0)
+        if self.gain != 1.0:
+            np.multiply(audio, self.gain, out=audio)
+            np.clip(audio, -1.0, 1.0, out=audio)
+
+class StrideScheduler:
+    """Picks the blocks that get an inference and debounces hits over time.
+
+    While idle only every ``idle_every``-th block is inferred; a hit or an
+    active session switches to every block until the debounce window is empty
+    again. The idle stride is capped at the model frame so consecutive idle
+    frames still overlap. Debouncing counts hits within the last
+    ``debounce_n * block_sec`` seconds rather than the last ``debounce_n``
+    blocks, so ``debounce_k`` means the same thing at either stride.
+
+    When an idle inference hits, the frames skipped inside the debounce window
+    are inferred after the fact (``backfill()``; the ring keeps enough history
+    for that), so a short bark is debounced exactly as at the fine stride.
+    """
+
+    __slots__ = ("idle_every", "window_sec", "block_sec", "_slack", "_hits", "_since", "_skipped", "inferences", "skipped")
+
+    def __init__(self, block_sec: float, frame_sec: float, idle_stride_sec: float, debounce_k: int, debounce_n: int):
+        every = int(round(idle_stride_sec / block_sec)) if idle_stride_sec > 0 else 1
+        self.idle_every = max(1, min(every, int(frame_sec / block_sec)))
+        self.window_sec = debounce_n * block_sec
+        self.block_sec = block_sec
+        self._slack = 0.5 * block_sec
+        self._hits = deque()
+        self._since = self.idle_every
+        self._skipped = deque(maxlen=max(0, min(self.idle_every, debounce_n) - 1))
+        self.inferences = 0
+        self.skipped = 0
+
+    @classmethod
+    def from_cfg(cls, cfg: Cfg) -> "StrideScheduler":
+        return cls(cfg.block_sec, cfg.frame_len / cfg.target_sr, cfg.idle_stride_sec, cfg.debounce_k, cfg.debounce_n)
+
+    def history(self, block_len: int) -> int:
+        """Extra ring samples needed to re-infer skipped frames of ``block_len`` samples."""
+        return self._skipped.maxlen * block_len
+
+    def due(self, in_session: bool, n: int) -> bool:
+        """Whether the block just written (``n`` samples at the model rate) gets an inference."""
+        self._since += 1
+        if in_session or self._hits or self._since >= self.idle_every:
+            self._since = 0
+            self.inferences += 1
+            return True
+        self._skipped.append(n)
+        self.skipped += 1
+        return False
+
+    def gated(self) -> None:
+        self._since = self.idle_every
+        self._skipped.clear()
+
+    def backfill(self):
+        """(samples back from the newest, age in blocks) of each skipped frame, oldest first."""
+        out = []
+        back = 0
+        for age, n in enumerate(reversed(self._skipped), start=1):
+            back += n
+            out.append((back, age))
+        self._skipped.clear()
+        self.inferences += len(out)
+        return out[::-1]
+
+    def update(self, now: float, is_hit: bool, ages=()) -> int:
+        """Record the current result plus hits found by backfill at ``ages`` blocks ago."""
+        for age in ages:
+            self._hits.append(now - age * self.block_sec)
+        if is_hit:
+            self._hits.append(now)
+        cutoff = now - self.window_sec + self._slack
+        while self._hits and self._hits[0] <= cutoff:
+            self._hits.popleft()
+        return len(self._hits)
+
+    def clear(self) -> None:
+        self._hits.clear()
+
+class SessionTracker:
+    """Bark session state machine: start, periodic heartbeats, end after silence.
+
+    ``update()`` takes the debounce result and signal of one frame and reports
+    events to ``sink(event_type, intensity, session_id, now)``. Time comes from
+    ``clock()`` unless the caller passes ``now``; session ids from ``new_id()``.
+    With ``sessions=False`` no session is ever started (DEMO mode).
+    """
+
+    __slots__ = (
+        "heartbeat_sec", "bark_end_sec", "sessions", "sink", "clock", "new_id",
+        "in_session", "session_id", "last_hit_ts", "last_send_ts", "window_peak", "window_cnt", "started", "ended",
+    )
+
+    def __init__(self, heartbeat_sec: float, bark_end_sec: float, sink, *, clock=time.time, new_id=None, sessions: bool=True):
+        self.heartbeat_sec = heartbeat_sec
+        self.bark_end_sec = bark_end_sec
+        self.sessions = sessions
+        self.sink = sink
+        self.clock = clock
+        self.new_id = new_id or (lambda: str(uuid.uuid4()))
+        self.in_session = False
+        self.session_id = None
+        self.last_hit_ts = 0.0
+        self.last_send_ts = 0.0
+        self.window_peak = 0.0
+        self.window_cnt = 0
+        self.started = 0
+        self.ended = 0
+
+    @classmethod
+    def from_cfg(cls, cfg: Cfg, sink, **kwargs) -> "SessionTracker":
+        return cls(cfg.heartbeat_sec, cfg.bark_end_sec, sink, **kwargs)
+
+    def _emit(self, event_type: str, intensity: int, now: float) -> None:
+        self.sink(event_type, intensity, self.session_id, now)
+        self.window_peak = 0.0
+        self.window_cnt = 0
+
+    def update(self, debounced: bool, signal: float, now: Optional[float]=None) -> Optional[str]:
+        """Advances by one frame; returns the event type emitted, if any."""
+        if now is None:
+            now = self.clock()
+        if debounced:
+            self.last_hit_ts = now
+            if signal > self.window_peak:
+                self.window_peak = signal
+            self.window_cnt += 1
+
+        if not self.in_session:
+            if debounced and self.sessions:
+                self.in_session = True
+                self.session_id = self.new_id()
+                self.started += 1
+                self.last_send_ts = now
+                self._emit("start", score_to_intensity(self.window_peak), now)
+                return "start"
+            return None
+
+        event = None
+        if debounced and (now - self.last_send_ts) >= self.heartbeat_sec:
+            self.last_send_ts = now
+            self._emit("heartbeat", score_to_intensity(self.window_peak), now)
+            event = "heartbeat"
+        if (now - self.last_hit_ts) >= self.bark_end_sec:
+            self.end(now)
+            event = "end"
+        return event
+
+    def end(self, now: Optional[float]=None) -> None:
+        if not self.in_session:
+            return
+        if now is None:
+            now = self.clock()
+        self._emit("end", score_to_intensity(self.window_peak) if self.window_cnt > 0 else 1, now)
+        self.in_session = False
+        self.session_id = None
+        self.ended += 1
+
 def clamp01(x: float) -> float:
     return float(max(0.0, min(1.0, x)))
 
@@ -148,6 +986,9 @@ def webhook_url(cfg: Cfg) -> str:
 def heartbeat_url(cfg: Cfg) -> str:
     return cfg.heartbeat_url_template.format(dog_id=cfg.dog_id)
 
+def batch_url(cfg: Cfg) -> str:
+    return cfg.batch_url_template.format(dog_id=cfg.dog_id)
+
 def auth_headers(cfg: Cfg) -> dict:
     headers = {
         "User-Agent": cfg.user_agent,
@@ -158,220 +999,1745 @@ def auth_headers(cfg: Cfg) -> dict:
         headers["Authorization"] = f"Bearer {cfg.api_token}"
     return headers
 
-def send_event(cfg: Cfg, intensity: int, *, session_id: Optional[str]=None, event_type: Optional[str]=None, debug: bool=False) -> bool:
-    url = webhook_url(cfg)
+def event_payload(cfg: Cfg, intensity: int, *, session_id: Optional[str]=None, event_type: Optional[str]=None, at: Optional[float]=None) -> dict:
+    ts = datetime.now(timezone.utc) if at is None else datetime.fromtimestamp(at, timezone.utc)
     payload = {
         "dog_id": cfg.dog_id,
         "intensity": int(intensity),
-        "triggered_at": datetime.now(timezone.utc).isoformat(),
+        "triggered_at": ts.isoformat(),
     }
     if cfg.send_session_fields:
         if session_id: payload["session_id"] = session_id
         if event_type: payload["type"] = event_type
+    return payload
 
-    try:
-        r = requests.post(
-            url,
-            json=payload,
-            timeout=cfg.http_timeout,
-            headers=auth_headers(cfg),
-        )
-        ok = 200 <= r.status_code < 300
-        if debug:
-            print(f"  -> POST {url} status={r.status_code} ok={ok} payload={payload}")
-        return ok
-    except Exception as e:
-        if debug:
-            print(f"  -> POST ERROR: {e} payload={payload}")
-        return False
-
-def send_heartbeat(cfg: Cfg, *, session_active: bool, debug: bool=False) -> bool:
-    url = heartbeat_url(cfg)
-    if not url:
-        return False
-    sent_at = datetime.now(timezone.utc).isoformat()
-    payload = {
+def heartbeat_payload(cfg: Cfg, *, session_active: bool) -> dict:
+    return {
         "dog_id": cfg.dog_id,
         "armed": True,
         "session_active": bool(session_active),
         "hostname": socket.gethostname(),
-        "sent_at": sent_at,
+        "sent_at": datetime.now(timezone.utc).isoformat(),
     }
-    try:
-        r = requests.post(
-            url,
-            json=payload,
-            timeout=cfg.http_timeout,
-            headers=auth_headers(cfg),
+
+class _TimedAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools time every new connection (DNS + TCP + TLS)."""
+
+    def __init__(self, client: "HttpClient", **kwargs):
+        self._client = client
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        client = self._client
+
+        def timed(conn_cls):
+            class Timed(conn_cls):
+                def connect(self):
+                    t0 = time.monotonic()
+                    super().connect()
+                    client.connects += 1
+                    client.last_connect_sec += time.monotonic() - t0
+            return Timed
+
+        class Pool(HTTPConnectionPool):
+            ConnectionCls = timed(HTTPConnection)
+
+        class SPool(HTTPSConnectionPool):
+            ConnectionCls = timed(HTTPSConnection)
+
+        self.poolmanager.pool_classes_by_scheme = {"http": Pool, "https": SPool}
+
+class HttpClient:
+    """Long-lived keep-alive session shared by all webhook/heartbeat posts."""
+
+    def __init__(self, cfg: Cfg):
+        self.cfg = cfg
+        self.connects = 0
+        self.last_connect_sec = 0.0
+        self.session = requests.Session()
+        self.session.headers.update(auth_headers(cfg))
+        if not cfg.keep_alive:
+            self.session.headers["Connection"] = "close"
+        # only retry connection failures, where the request never reached the
+        # server; anything else is left to the outbox so POSTs are not duplicated
+        retry = Retry(
+            total=max(0, cfg.http_retries),
+            connect=max(0, cfg.http_retries),
+            read=0,
+            status=0,
+            other=0,
+            backoff_factor=cfg.http_backoff,
+            raise_on_status=False,
         )
-        ok = 200 <= r.status_code < 300
-        if ok:
-            record_heartbeat_state(cfg, sent_at, session_active)
+        pool = max(1, cfg.pool_size)
+        adapter = _TimedAdapter(self, pool_connections=pool, pool_maxsize=pool, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self) -> None:
+        self.session.close()
+
+def post_json(client: HttpClient, url: str, payload, *, debug: bool=False) -> Optional[int]:
+    client.last_connect_sec = 0.0
+    connects = client.connects
+    t0 = time.monotonic()
+    try:
+        r = client.session.post(url, json=payload, timeout=client.cfg.http_timeout)
         if debug:
-            print(f"  -> POST {url} status={r.status_code} ok={ok} payload={payload}")
-        return ok
+            ok = 200 <= r.status_code < 300
+            total = time.monotonic() - t0
+            conn = "new" if client.connects > connects else "reused"
+            print(f"  -> POST {url} status={r.status_code} ok={ok} conn={conn} handshake={client.last_connect_sec:.3f}s request={total - client.last_connect_sec:.3f}s payload={payload}")
+        return r.status_code
     except Exception as e:
         if debug:
             print(f"  -> POST ERROR: {e} payload={payload}")
+        return None
+
+def status_ok(status: Optional[int]) -> bool:
+    return status is not None and 200 <= status < 300
+
+def status_rejected(status: Optional[int]) -> bool:
+    # the platform refused the payload itself; sending it again cannot succeed
+    return status is not None and 400 <= status < 500 and status not in (408, 429)
+
+def post_event(client: HttpClient, payload: dict, *, debug: bool=False) -> bool:
+    return status_ok(post_json(client, webhook_url(client.cfg), payload, debug=debug))
+
+def post_heartbeat(client: HttpClient, payload: dict, *, debug: bool=False) -> bool:
+    url = heartbeat_url(client.cfg)
+    if not url:
         return False
+    ok = status_ok(post_json(client, url, payload, debug=debug))
+    if ok:
+        record_heartbeat_state(client.cfg, payload["sent_at"], payload["session_active"])
+    return ok
+
+class Histogram:
+    """Fixed-bucket histogram; ``observe()`` is a bisect over the bounds and an increment."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = tuple(float(b) for b in bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str="") -> list:
+        sep = "," if labels else ""
+        out = []
+        total = 0
+        for bound, n in zip(self.bounds, self.counts):
+            total += n
+            out.append(f'{name}_bucket{{{labels}{sep}le="{bound:g}"}} {total}')
+        out.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        out.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        out.append(f"{name}_count{suffix} {self.count}")
+        return out
+
+INFERENCE_BUCKETS = (0.005, 0.01, 0.02, 0.03, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0)
+DELIVERY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+def write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class Outbox:
+    """Append-only journal of session events that still have to be delivered.
+
+    Every event is fsynced to ``path`` before any delivery attempt; the highest
+    delivered sequence number lives in ``<path>.ack``. On restart, journal
+    entries above the ack are loaded again and replayed in order. The journal is
+    truncated once everything in it has been acknowledged, and rewritten with
+    just the pending entries once it grows past ``2 * max_events`` lines, so a
+    long outage cannot grow it without bound.
+    """
+
+    def __init__(self, path: str, *, max_events: int=10000):
+        self.path = Path(path).expanduser()
+        self.ack_path = self.path.with_name(self.path.name + ".ack")
+        self.max_events = max(1, max_events)
+        self.pending = deque()
+        self.acked_seq = 0
+        self.next_seq = 1
+        self.dropped = 0
+        self._lines = 0
+        self._load()
+
+    def _load(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self.acked_seq = int(json.loads(self.ack_path.read_text()).get("seq", 0))
+        except Exception:
+            self.acked_seq = 0
+        self.next_seq = self.acked_seq + 1
+        try:
+            f = open(self.path)
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                self._lines += 1
+                try:
+                    rec = json.loads(line)
+                    seq = int(rec["seq"])
+                    payload = rec["payload"]
+                except Exception:
+                    # torn tail from a crash mid-append
+                    continue
+                self.next_seq = max(self.next_seq, seq + 1)
+                if seq > self.acked_seq:
+                    self.pending.append((seq, payload, None))
+        while len(self.pending) > self.max_events:
+            self.pending.popleft()
+            self.dropped += 1
+        if self._lines > len(self.pending):
+            self._compact()
+
+    def _compact(self) -> None:
+        write_atomic(self.path, "".join(
+            json.dumps({"seq": seq, "payload": payload}, separators=(",", ":")) + "\n"
+            for seq, payload, _ in self.pending
+        ))
+        self._lines = len(self.pending)
+
+    def append(self, payload: dict, queued_at: Optional[float]=None) -> int:
+        seq = self.next_seq
+        self.next_seq += 1
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"seq": seq, "payload": payload}, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._lines += 1
+        self.pending.append((seq, payload, queued_at))
+        if len(self.pending) > self.max_events:
+            old_seq, _, _ = self.pending.popleft()
+            self.dropped += 1
+            self._write_ack(old_seq)
+        if self._lines > 2 * self.max_events:
+            self._compact()
+        return seq
+
+    def peek(self, n: int) -> list:
+        return [self.pending[i] for i in range(min(n, len(self.pending)))]
+
+    def ack(self, seq: int) -> None:
+        while self.pending and self.pending[0][0] <= seq:
+            self.pending.popleft()
+        self._write_ack(seq)
+        if not self.pending:
+            with open(self.path, "w") as f:
+                f.flush()
+                os.fsync(f.fileno())
+            self._lines = 0
+        elif self._lines > 2 * self.max_events:
+            self._compact()
+
+    def _write_ack(self, seq: int) -> None:
+        self.acked_seq = max(self.acked_seq, seq)
+        write_atomic(self.ack_path, json.dumps({"seq": self.acked_seq}))
+
+def post_batch(client: HttpClient, payloads: list, *, debug: bool=False) -> Optional[int]:
+    cfg = client.cfg
+    return post_json(client, batch_url(cfg), {"dog_id": cfg.dog_id, "events": payloads}, debug=debug)
+
+class Delivery:
+    """Background sender so the capture loop never blocks on the network.
+
+    Payloads are built (and timestamped) by the caller and handed over through a
+    bounded queue; when the queue is full the new item is dropped and counted.
+    Session events go through the outbox (if configured) and are retried with
+    exponential backoff; status heartbeats are best effort.
+    """
+
+    def __init__(self, cfg: Cfg, *, client: Optional[HttpClient]=None, outbox: Optional[Outbox]=None, debug: bool=False):
+        self.cfg = cfg
+        self.debug = debug
+        self.client = client or HttpClient(cfg)
+        self.outbox = outbox
+        self._q = queue.Queue(maxsize=max(1, cfg.queue_size))
+        self._thread = threading.Thread(target=self._run, name="barksignal-delivery", daemon=True)
+        self._batching = bool(cfg.batch_url_template)
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self.enqueued = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.failed = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.latency = Histogram(DELIVERY_BUCKETS)
+
+    def start(self) -> "Delivery":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float=5.0) -> None:
+        try:
+            self._q.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    @property
+    def depth(self) -> int:
+        return self._q.qsize()
+
+    def submit_event(self, payload: dict) -> bool:
+        return self._submit("event", payload)
+
+    def submit_heartbeat(self, payload: dict) -> bool:
+        return self._submit("heartbeat", payload)
+
+    def _submit(self, kind: str, payload: dict) -> bool:
+        try:
+            self._q.put_nowait((kind, payload, time.monotonic()))
+        except queue.Full:
+            self.dropped += 1
+            if self.debug:
+                print(f"  -> QUEUE FULL: dropped {kind} payload={payload}")
+            return False
+        self.enqueued += 1
+        return True
+
+    def _record(self, ok: bool, queued_at: Optional[float]) -> None:
+        if queued_at is not None:
+            latency = time.monotonic() - queued_at
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+            self.latency.observe(latency)
+        if ok:
+            self.delivered += 1
+        else:
+            self.failed += 1
+
+    def _run(self) -> None:
+        while True:
+            wait = None
+            if self.outbox is not None and self.outbox.pending:
+                wait = max(0.0, self._retry_at - time.monotonic())
+            try:
+                item = self._q.get(timeout=wait)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                self.client.close()
+                return
+            if item:
+                kind, payload, queued_at = item
+                if kind == "heartbeat":
+                    ok = post_heartbeat(self.client, payload, debug=self.debug)
+                    self._record(ok, queued_at)
+                    if ok:
+                        # the network is back: retry the outbox now, not when the backoff expires
+                        self._backoff = self._retry_at = 0.0
+                elif self.outbox is None:
+                    self._record(post_event(self.client, payload, debug=self.debug), queued_at)
+                else:
+                    try:
+                        self.outbox.append(payload, queued_at)
+                        # a live event is worth an immediate attempt
+                        self._backoff = self._retry_at = 0.0
+                    except OSError as e:
+                        if self.debug:
+                            print(f"  -> OUTBOX ERROR: {e}")
+                        self._record(post_event(self.client, payload, debug=self.debug), queued_at)
+            if self.outbox is not None and self.outbox.pending and time.monotonic() >= self._retry_at:
+                if self._flush_outbox():
+                    self._backoff = 0.0
+                else:
+                    self._backoff = min(self.cfg.retry_max_sec, max(self.cfg.retry_min_sec, self._backoff * 2))
+                    self._retry_at = time.monotonic() + self._backoff
+
+    def _flush_outbox(self) -> bool:
+        ob = self.outbox
+        single = False
+        while ob.pending:
+            if self._batching and not single and len(ob.pending) > 1:
+                batch = ob.peek(max(1, self.cfg.batch_size))
+                status = post_batch(self.client, [p for _, p, _ in batch], debug=self.debug)
+                if status in (404, 405, 501):
+                    # endpoint not available on this platform: replay one by one
+                    self._batching = False
+                    continue
+                if status_rejected(status):
+                    # find out which event was refused instead of dropping the whole batch
+                    single = True
+                    continue
+            else:
+                batch = ob.peek(1)
+                status = post_json(self.client, webhook_url(self.cfg), batch[0][1], debug=self.debug)
+            ok = status_ok(status)
+            if not ok and not status_rejected(status):
+                self.failed += 1
+                return False
+            for _, _, queued_at in batch:
+                self._record(ok, queued_at)
+            if not ok:
+                ob.dropped += 1
+                if self.debug:
+                    print(f"  -> REJECTED ({status}): dropped payload={batch[0][1]}")
+            try:
+                ob.ack(batch[-1][0])
+            except OSError as e:
+                if self.debug:
+                    print(f"  -> OUTBOX ERROR: {e}")
+                return False
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.depth,
+            "outbox_pending": len(self.outbox.pending) if self.outbox is not None else 0,
+            "outbox_dropped": self.outbox.dropped if self.outbox is not None else 0,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "last_latency_sec": round(self.last_latency, 3),
+            "max_latency_sec": round(self.max_latency, 3),
+        }
+
+_heartbeat_state_lock = threading.Lock()
 
 def record_heartbeat_state(cfg: Cfg, sent_at: str, session_active: bool) -> None:
     if not cfg.heartbeat_state_path:
         return
+    state = {
+        "last_ok_at": sent_at,
+        "dog_id": cfg.dog_id,
+        "session_active": bool(session_active),
+    }
     try:
         p = Path(cfg.heartbeat_state_path)
         p.parent.mkdir(parents=True, exist_ok=True)
-        p.write_text(json.dumps({
-            "last_ok_at": sent_at,
-            "dog_id": cfg.dog_id,
-            "session_active": bool(session_active),
-        }))
+        with _heartbeat_state_lock:
+            if cfg.stream_name:
+                # streams share the file: each keeps its own entry under "streams",
+                # the top level (read by the portal) reflects the latest heartbeat
+                try:
+                    streams = dict(json.loads(p.read_text()).get("streams") or {})
+                except (OSError, ValueError, AttributeError, TypeError):
+                    streams = {}
+                streams[cfg.stream_name] = dict(state)
+                state["session_active"] = any(bool(v.get("session_active")) for v in streams.values() if isinstance(v, dict))
+                state["streams"] = streams
+            write_atomic(p, json.dumps(state))
     except Exception:
         pass
 
+def build_interpreter(cfg: Cfg):
+    """Returns (interpreter, backend description), falling back to plain CPU kernels."""
+    from tflite_runtime import interpreter as tfl
+
+    model_path = str(Path(cfg.model_path).expanduser())
+    threads = cfg.num_threads if cfg.num_threads > 0 else (os.cpu_count() or 1)
+    kind = cfg.delegate.lower()
+    resolver = getattr(tfl, "OpResolverType", None)
+
+    if kind not in ("", "none", "xnnpack"):
+        try:
+            delegate = tfl.load_delegate(cfg.delegate)
+            itp = tfl.Interpreter(model_path=model_path, num_threads=threads, experimental_delegates=[delegate])
+            itp.allocate_tensors()
+            return itp, f"delegate={cfg.delegate} threads={threads}"
+        except Exception as e:
+            print(f"⚠️  delegate {cfg.delegate} unavailable ({e}), falling back to xnnpack")
+            kind = "xnnpack"
+
+    if kind == "xnnpack":
+        try:
+            kwargs = {}
+            if resolver is not None:
+                kwargs["experimental_op_resolver_type"] = resolver.AUTO
+            itp = tfl.Interpreter(model_path=model_path, num_threads=threads, **kwargs)
+            itp.allocate_tensors()
+            # without OpResolverType the runtime's default resolver decides, so don't claim xnnpack
+            return itp, f"{'xnnpack' if resolver is not None else 'default'} threads={threads}"
+        except Exception as e:
+            print(f"⚠️  xnnpack unavailable ({e}), falling back to builtin kernels")
+
+    kwargs = {}
+    if resolver is not None:
+        kwargs["experimental_op_resolver_type"] = resolver.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+    itp = tfl.Interpreter(model_path=model_path, num_threads=threads, **kwargs)
+    itp.allocate_tensors()
+    return itp, f"{'builtin' if resolver is not None else 'default'} threads={threads}"
+
+def read_soc_temp() -> Optional[float]:
+    try:
+        return int(Path("/sys/class/thermal/thermal_zone0/temp").read_text().strip()) / 1000.0
+    except Exception:
+        return None
+
+class Model:
+    """TFLite YAMNet wrapper handling float, float16 and int8 variants.
+
+    Quantized input/output tensors are converted with the scale/zero-point
+    from the tensor details through preallocated buffers. When the model also
+    exposes the 1024-d embeddings and ``head_path`` is set, a logistic dog head
+    (``w``, ``b`` in an .npz) is evaluated on them and stored in ``head_score``.
+    """
+
+    def __init__(self, cfg: Cfg, itp=None):
+        self.backend = "custom"
+        self.path = cfg.model_path
+        self._cfg = cfg
+        own = itp is None
+        if own:
+            itp, self.backend = build_interpreter(cfg)
+        else:
+            itp.allocate_tensors()
+        self.itp = itp
+        self.frame_len = cfg.frame_len
+        self.baseline_sec = 0.0
+        self.invoke_ema = 0.0
+        self.latency = Histogram(INFERENCE_BUCKETS)
+        self.recording = True
+
+        self.inp = self.itp.get_input_details()[0]
+        in_shape = tuple(self.inp["shape"])
+        if in_shape not in [(cfg.frame_len,), (1, cfg.frame_len)]:
+            raise RuntimeError(f"Unexpected input shape {self.inp['shape']}")
+        self._batched = in_shape == (1, cfg.frame_len)
+        # batches run on a second interpreter allocated once, so single frames
+        # and backfill never resize (and re-prepare) the main one
+        self.can_batch = own and self._batched and hasattr(self.itp, "resize_tensor_input")
+        self.batch_rows = 0
+        self._batch = None
+
+        outputs = self.itp.get_output_details()
+        scores = [d for d in outputs if len(d["shape"]) and int(d["shape"][-1]) == 521]
+        if not scores:
+            raise RuntimeError(f"No 521-class score output in {[list(d['shape']) for d in outputs]}")
+        self.out = scores[0]
+        emb = [d for d in outputs if len(d["shape"]) and int(d["shape"][-1]) == 1024]
+        self.emb = emb[0] if emb else None
+
+        self._in_q = self._quant(self.inp)
+        if self._in_q is not None:
+            info = np.iinfo(self.inp["dtype"])
+            self._in_lo, self._in_hi = float(info.min), float(info.max)
+            self._in_f = np.empty(cfg.frame_len, dtype=np.float32)
+            self._in_buf = np.empty(cfg.frame_len, dtype=self.inp["dtype"])
+        elif np.dtype(self.inp["dtype"]) != np.float32:
+            self._in_buf = np.empty(cfg.frame_len, dtype=self.inp["dtype"])
+        else:
+            self._in_buf = None
+        self._out_q = self._quant(self.out)
+        self._out_buf = np.empty(521, dtype=np.float32)
+
+        self.head = None
+        self.head_score = 0.0
+        if cfg.head_path:
+            if self.emb is None:
+                raise RuntimeError(f"head_path is set but {cfg.model_path} has no 1024-d embeddings output")
+            data = np.load(str(Path(cfg.head_path).expanduser()))
+            w = np.asarray(data["w"], dtype=np.float32).reshape(-1)
+            if len(w) != 1024:
+                raise RuntimeError(f"Dog head expects 1024 weights, got {len(w)}")
+            self.head = (w, float(np.asarray(data["b"]).reshape(-1)[0]), self._quant(self.emb))
+
+    @property
+    def kind(self) -> str:
+        if self._in_q is not None or self._out_q is not None:
+            return str(np.dtype(self.inp["dtype"]))
+        return "float"
+
+    @staticmethod
+    def _quant(detail: dict):
+        if np.dtype(detail["dtype"]) not in (np.dtype(np.int8), np.dtype(np.uint8), np.dtype(np.int16)):
+            return None
+        scale, zero_point = detail.get("quantization", (0.0, 0))
+        if not scale or scale <= 0:
+            raise RuntimeError(f"Tensor {detail.get('name', detail['index'])} is {np.dtype(detail['dtype'])} without quantization params")
+        return float(scale), int(zero_point)
+
+    def _batch_interpreter(self, rows: int):
+        """(interpreter, input buffer) with at least ``rows`` rows; unused rows are zero padding."""
+        rows = max(rows, self.batch_rows)
+        if self._batch is None or len(self._batch[1]) < rows:
+            itp, _ = build_interpreter(self._cfg)
+            itp.resize_tensor_input(self.inp["index"], [rows, self.frame_len])
+            itp.allocate_tensors()
+            self._batch = (itp, np.zeros((rows, self.frame_len), dtype=self.inp["dtype"]))
+        return self._batch
+
+    def set_input(self, window: np.ndarray) -> None:
+        x = window
+        if self._in_q is not None:
+            scale, zp = self._in_q
+            np.multiply(window, 1.0 / scale, out=self._in_f)
+            np.add(self._in_f, zp, out=self._in_f)
+            np.rint(self._in_f, out=self._in_f)
+            np.clip(self._in_f, self._in_lo, self._in_hi, out=self._in_f)
+            self._in_buf[:] = self._in_f
+            x = self._in_buf
+        elif self._in_buf is not None:
+            self._in_buf[:] = window
+            x = self._in_buf
+        if self._batched:
+            x = x.reshape(1, -1)
+        self.itp.set_tensor(self.inp["index"], x)
+
+    def read_scores(self) -> np.ndarray:
+        raw = self.itp.get_tensor(self.out["index"]).reshape(-1, 521)[0]
+        if self._out_q is None:
+            return raw
+        scale, zp = self._out_q
+        np.subtract(raw, zp, out=self._out_buf, dtype=np.float32)
+        np.multiply(self._out_buf, scale, out=self._out_buf)
+        return self._out_buf
+
+    def _head_score(self, emb: np.ndarray) -> float:
+        w, b, q = self.head
+        if q is not None:
+            emb = (emb.astype(np.float32) - q[1]) * q[0]
+        z = float(np.dot(emb, w)) + b
+        return 1.0 / (1.0 + math.exp(-max(-60.0, min(60.0, z))))
+
+    def _update_head(self) -> None:
+        self.head_score = self._head_score(self.itp.get_tensor(self.emb["index"]).reshape(-1, 1024)[0])
+
+    def _timed_invoke(self, frames: int=1, itp=None) -> None:
+        t0 = time.perf_counter()
+        (itp or self.itp).invoke()
+        dt = (time.perf_counter() - t0) / frames
+        if not self.recording:
+            return
+        self.latency.observe(dt)
+        self.invoke_ema = dt if self.invoke_ema == 0.0 else self.invoke_ema + 0.05 * (dt - self.invoke_ema)
+
+    def infer(self, window: np.ndarray) -> np.ndarray:
+        self.set_input(window)
+        self._timed_invoke()
+        if self.head is not None:
+            self._update_head()
+        return self.read_scores()
+
+    def infer_many(self, frames: list) -> list:
+        """(scores, head_score) per frame, in one invocation when the model has a batch dimension."""
+        if len(frames) == 1:
+            return [(self.infer(frames[0]), self.head_score)]
+        if self.can_batch:
+            try:
+                itp, x = self._batch_interpreter(len(frames))
+            except (RuntimeError, ValueError) as e:
+                # e.g. a model converted with a fixed batch size
+                print(f"⚠️  model does not accept batched input, inferring frames one by one: {e}", file=sys.stderr)
+                self.can_batch = False
+        if not self.can_batch:
+            return [(self.infer(f).copy(), self.head_score) for f in frames]
+
+        n = len(frames)
+        if self._in_q is not None:
+            scale, zp = self._in_q
+            x[:n] = np.clip(np.rint(np.stack(frames) / scale + zp), self._in_lo, self._in_hi)
+        else:
+            for i, f in enumerate(frames):
+                x[i] = f
+        x[n:] = 0
+        itp.set_tensor(self.inp["index"], x)
+        self._timed_invoke(n, itp)
+        scores = itp.get_tensor(self.out["index"]).reshape(-1, 521)[:n].astype(np.float32)
+        if self._out_q is not None:
+            scale, zp = self._out_q
+            scores = (scores - zp) * scale
+        heads = [0.0] * len(frames)
+        if self.head is not None:
+            emb = itp.get_tensor(self.emb["index"]).reshape(-1, 1024)
+            heads = [self._head_score(emb[i]) for i in range(n)]
+        return list(zip(scores, heads))
+
+    def warmup(self, runs: int) -> dict:
+        x = np.zeros(self.frame_len, dtype=np.float32)
+        times = []
+        # warm-up outliers stay out of the latency histogram and the EMA
+        self.recording = False
+        try:
+            for _ in range(max(1, runs)):
+                t0 = time.perf_counter()
+                self.infer(x)
+                times.append(time.perf_counter() - t0)
+        finally:
+            self.recording = True
+        # the first invocation includes lazy kernel setup
+        steady = times[1:] or times
+        self.baseline_sec = float(np.median(steady))
+        self.invoke_ema = self.baseline_sec
+        return {
+            "first_ms": times[0] * 1e3,
+            "p50_ms": self.baseline_sec * 1e3,
+            "max_ms": max(steady) * 1e3,
+        }
+
+    def throttled(self, factor: float) -> bool:
+        return self.baseline_sec > 0 and self.invoke_ema > factor * self.baseline_sec
+
+MODEL_VARIANTS = ("float", "float16", "int8")
+
+def variant_paths(cfg: Cfg) -> dict:
+    paths = {
+        "float": cfg.model_path,
+        "float16": cfg.model_path_float16,
+        "int8": cfg.model_path_int8,
+    }
+    return {k: v for k, v in paths.items() if v and Path(v).expanduser().exists()}
+
+def select_model(cfg: Cfg) -> tuple:
+    """Returns (model, warm-up stats) for [model] variant; 'auto' keeps the fastest available variant."""
+    variant = cfg.model_variant or "float"
+    if variant != "auto":
+        if variant not in MODEL_VARIANTS:
+            raise ValueError(f"[model] variant must be auto or one of {MODEL_VARIANTS}, got {variant!r}")
+        path = {"float": cfg.model_path, "float16": cfg.model_path_float16, "int8": cfg.model_path_int8}[variant]
+        if not path:
+            raise KeyError(f"[model] variant = {variant} but no {variant}_path is configured")
+        model = Model(replace(cfg, model_path=path))
+        return model, (model.warmup(cfg.warmup_runs) if cfg.warmup_runs > 0 else None)
+
+    best = None
+    for name, path in variant_paths(cfg).items():
+        try:
+            model = Model(replace(cfg, model_path=path))
+        except Exception as e:
+            print(f"⚠️  model variant {name} ({path}) unusable: {e}", file=sys.stderr)
+            continue
+        w = model.warmup(max(cfg.warmup_runs, 5))
+        print(f"model variant {name}: {model.backend} p50={w['p50_ms']:.1f}ms", file=sys.stderr)
+        if best is None or w["p50_ms"] < best[1]["p50_ms"]:
+            best = (model, w)
+    if best is None:
+        raise RuntimeError("No usable model variant found")
+    return best
+
+class LiveSource:
+    def __init__(self, cfg: Cfg, ready: Optional[threading.Event]=None):
+        import sounddevice as sd
+        self._sd = sd
+        self.device = cfg.input_device
+        info = sd.query_devices(cfg.input_device, "input")
+        self.in_sr = int(info["default_samplerate"])
+        self.block_len = max(1, int(self.in_sr * cfg.block_sec))
+        self.capture = BlockQueue(cfg.queue_blocks, self.block_len, ready)
+        self.stall_sec = max(5.0, 10 * cfg.block_sec)
+
+    def now(self) -> float:
+        # wall-clock time the current block was captured, not when it is
+        # processed: queued blocks drained back to back after a slow inference
+        # must stay block_sec apart for the time-based debounce window
+        stamp = self.capture.last_stamp
+        if not stamp:
+            return time.time()
+        return time.time() - (time.monotonic() - stamp)
+
+    def stamp(self, now: float) -> str:
+        return time.strftime("%H:%M:%S", time.localtime(now))
+
+    def stream(self):
+        return self._sd.InputStream(
+            device=self.device,
+            samplerate=self.in_sr,
+            channels=1,
+            dtype="float32",
+            blocksize=self.block_len,
+            callback=self.capture.callback,
+        )
+
+    def blocks(self):
+        with self.stream():
+            while True:
+                audio = self.capture.get(timeout=self.stall_sec)
+                if audio is None:
+                    raise RuntimeError(f"No audio from input device {self.device} for {self.stall_sec:.0f}s")
+                yield audio
+                self.capture.release()
+
+AUDIO_SUFFIXES = (".wav", ".flac", ".ogg")
+
+def audio_files(path: Path) -> list:
+    if path.is_dir():
+        return sorted(p for p in path.rglob("*") if p.is_file() and p.suffix.lower() in AUDIO_SUFFIXES)
+    return [path]
+
+def pcm_to_float(raw: bytes, sampwidth: int, channels: int) -> np.ndarray:
+    if sampwidth == 1:
+        x = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sampwidth == 2:
+        x = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif sampwidth == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        v = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        v = np.where(v >= 1 << 23, v - (1 << 24), v)
+        x = v.astype(np.float32) / float(1 << 23)
+    elif sampwidth == 4:
+        x = np.frombuffer(raw, dtype="<i4").astype(np.float32) / float(1 << 31)
+    else:
+        raise RuntimeError(f"Unsupported WAV sample width {sampwidth}")
+    if channels > 1:
+        x = x.reshape(-1, channels).mean(axis=1)
+    return x
+
+class FileSource:
+    """Streams a recording block by block; the clock is the position in the file."""
+
+    def __init__(self, path: Path, cfg: Cfg):
+        self.path = path
+        self.block_sec = cfg.block_sec
+        self.pos = 0
+        if path.suffix.lower() == ".wav":
+            with wave.open(str(path), "rb") as w:
+                self.in_sr = w.getframerate()
+            self._sf = None
+        else:
+            try:
+                import soundfile
+            except ImportError:
+                raise RuntimeError(f"Reading {path.suffix} files needs the soundfile package (pip install soundfile)")
+            self._sf = soundfile
+            self.in_sr = int(soundfile.info(str(path)).samplerate)
+        self.block_len = max(1, int(self.in_sr * cfg.block_sec))
+
+    def now(self) -> float:
+        return self.pos / self.in_sr
+
+    def stamp(self, now: float) -> str:
+        return f"{now:9.2f}s"
+
+    def blocks(self):
+        if self._sf is None:
+            with wave.open(str(self.path), "rb") as w:
+                width = w.getsampwidth()
+                channels = w.getnchannels()
+                while True:
+                    raw = w.readframes(self.block_len)
+                    if not raw:
+                        return
+                    audio = pcm_to_float(raw, width, channels)
+                    self.pos += len(audio)
+                    yield audio
+        else:
+            for audio in self._sf.blocks(str(self.path), blocksize=self.block_len, dtype="float32", always_2d=True):
+                audio = audio.mean(axis=1) if audio.shape[1] > 1 else np.ascontiguousarray(audio[:, 0])
+                self.pos += len(audio)
+                yield audio
+
+class BlockLog:
+    """Compact JSON debug records for ``[debug] log_format = json``.
+
+    Every ``summary_sec`` one summary record (block counts, min/max/mean signal,
+    histogram of top classes) is written. Per-block records are kept only around
+    hits: from ``detail_sec`` before a hit until ``detail_sec`` after the last
+    one, and for the whole of a session. Records outside that window are held
+    unformatted in a short buffer and discarded.
+    """
+
+    __slots__ = (
+        "stream", "labels", "names", "idx", "summary_sec", "detail_sec", "write", "_pre", "_until",
+        "_start", "_blocks", "_inferred", "_gated", "_min", "_max", "_sum", "_top",
+    )
+
+    def __init__(self, scorer: Scorer, labels: tuple, *, stream: str="", summary_sec: float=1.0, detail_sec: float=2.0, block_sec: float=0.25, write=print):
+        self.stream = stream
+        self.labels = labels
+        self.names = scorer.names
+        self.idx = [labels.index(n) for n in scorer.names]
+        self.summary_sec = summary_sec
+        self.detail_sec = detail_sec
+        self.write = write
+        self._pre = deque(maxlen=max(1, int(math.ceil(detail_sec / block_sec))))
+        self._until = float("-inf")
+        self._start = None
+        self._reset()
+
+    @classmethod
+    def from_cfg(cls, cfg: Cfg, scorer: Scorer, idx: LabelIndex) -> "BlockLog":
+        return cls(scorer, idx.names, stream=cfg.stream_name, summary_sec=cfg.log_summary_sec, detail_sec=cfg.log_detail_sec, block_sec=cfg.block_sec)
+
+    def _reset(self) -> None:
+        self._blocks = 0
+        self._inferred = 0
+        self._gated = 0
+        self._min = float("inf")
+        self._max = 0.0
+        self._sum = 0.0
+        self._top = {}
+
+    def _emit(self, rec: dict) -> None:
+        if self.stream:
+            rec["stream"] = self.stream
+        self.write(json.dumps(rec, separators=(",", ":")))
+
+    def _detail(self, rec: tuple) -> None:
+        now, signal, top_i, top_score, values, hits = rec
+        self._emit({
+            "t": round(now, 3),
+            "kind": "block",
+            "sig": round(signal, 3),
+            "top": self.labels[top_i],
+            "top_score": round(top_score, 3),
+            "scores": {n: round(v, 3) for n, v in zip(self.names, values)},
+            "hits": hits,
+        })
+
+    def block(self, now: float, signal: float, scores: Optional[np.ndarray], hits: int, hit: bool, in_session: bool, gated: bool) -> None:
+        if self._start is None:
+            self._start = now
+        self._blocks += 1
+        if gated:
+            self._gated += 1
+        if scores is not None:
+            self._inferred += 1
+            self._sum += signal
+            if signal < self._min:
+                self._min = signal
+            if signal > self._max:
+                self._max = signal
+            top_i = int(np.argmax(scores))
+            self._top[top_i] = self._top.get(top_i, 0) + 1
+            rec = (now, signal, top_i, float(scores[top_i]), [float(scores[i]) for i in self.idx], hits)
+            if hit or in_session:
+                self._until = now + self.detail_sec
+                while self._pre:
+                    pre = self._pre.popleft()
+                    if pre[0] >= now - self.detail_sec:
+                        self._detail(pre)
+                self._detail(rec)
+            elif now <= self._until:
+                self._detail(rec)
+            else:
+                self._pre.append(rec)
+        if now - self._start >= self.summary_sec:
+            self.flush(now)
+
+    def flush(self, now: float) -> None:
+        if self._blocks:
+            n = self._inferred
+            self._emit({
+                "t": round(now, 3),
+                "kind": "summary",
+                "sec": round(now - self._start, 3),
+                "blocks": self._blocks,
+                "inferred": n,
+                "gated": self._gated,
+                "sig_min": round(self._min, 3) if n else None,
+                "sig_max": round(self._max, 3) if n else None,
+                "sig_mean": round(self._sum / n, 3) if n else None,
+                "top": {self.labels[i]: c for i, c in sorted(self._top.items(), key=lambda kv: -kv[1])},
+            })
+        self._start = now
+        self._reset()
+
+    def event(self, event_type: str, intensity: int, session_id: Optional[str], now: float) -> None:
+        self._emit({"t": round(now, 3), "kind": "event", "type": event_type, "intensity": int(intensity), "session_id": session_id})
+
+CLIP_SUFFIXES = (".wav", ".flac")
+
+class ClipRecorder:
+    """Saves pre-roll + session + post-roll audio of every bark session.
+
+    The detector thread only converts each 16 kHz block to int16 into a
+    pre-roll ring (and, during a session, appends a copy of it). Sessions
+    longer than ``max_sec`` keep their most recent ``max_sec`` so the clip
+    still shows how the session ended; pre- and post-roll are always kept. Finished clips
+    go through a bounded queue to a writer thread that encodes them as 16-bit
+    WAV or FLAC, writes them atomically and then evicts clips older than
+    ``max_age_days`` and, oldest first, beyond ``max_mb`` in total. Clips are
+    dropped (and counted) when the writer falls behind.
+    """
+
+    def __init__(self, cfg: Cfg, *, debug: bool=False):
+        self.dir = Path(cfg.clips_dir).expanduser()
+        self.format = cfg.clips_format
+        self.sr = cfg.target_sr
+        self.prefix = cfg.dog_id if not cfg.stream_name else f"{cfg.dog_id}_{cfg.stream_name}"
+        self.post_samples = int(cfg.clips_post_sec * self.sr)
+        self.max_samples = int(cfg.clips_max_sec * self.sr)
+        self.max_bytes = int(cfg.clips_max_mb * 1024 * 1024)
+        self.max_age_sec = cfg.clips_max_age_days * 86400.0
+        self.debug = debug
+        self._sf = None
+        if self.format == "flac":
+            try:
+                import soundfile
+            except ImportError:
+                raise RuntimeError("[clips] format = flac needs the soundfile package (pip install soundfile)")
+            self._sf = soundfile
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+        self.pre = RingBuffer(max(1, int(cfg.clips_pre_sec * self.sr)), dtype=np.int16)
+        self._f = np.empty(0, dtype=np.float32)
+        self._i = np.empty(0, dtype=np.int16)
+        self._head = None
+        self._chunks = None
+        self._post = []
+        self._samples = 0
+        self._post_left = -1
+        self._name = ""
+        self.written = 0
+        self.dropped = 0
+        self._q = queue.Queue(maxsize=4)
+        self._thread = threading.Thread(target=self._run, name="barksignal-clips", daemon=True)
+        self._thread.start()
+
+    def write(self, x: np.ndarray) -> None:
+        n = len(x)
+        if len(self._f) < n:
+            self._f = np.empty(n, dtype=np.float32)
+            self._i = np.empty(n, dtype=np.int16)
+        f = self._f[:n]
+        np.multiply(x, 32767.0, out=f)
+        np.clip(f, -32768.0, 32767.0, out=f)
+        i = self._i[:n]
+        i[:] = f
+        self.pre.write(i)
+
+        if self._chunks is None:
+            return
+        if self._post_left >= 0:
+            self._post.append(i.copy())
+            self._post_left -= n
+            if self._post_left <= 0:
+                self._finish()
+            return
+        self._chunks.append(i.copy())
+        self._samples += n
+        while self._samples > self.max_samples and self._chunks:
+            excess = self._samples - self.max_samples
+            first = self._chunks[0]
+            if len(first) <= excess:
+                self._chunks.popleft()
+                self._samples -= len(first)
+            else:
+                self._chunks[0] = first[excess:]
+                self._samples -= excess
+
+    def event(self, event_type: str, intensity: int, session_id: Optional[str], now: float) -> None:
+        if event_type == "start":
+            if self._chunks is not None:
+                self._finish()
+            stamp = datetime.fromtimestamp(now, timezone.utc).strftime("%Y%m%dT%H%M%SZ") if now > 1e9 else f"{now:09.2f}s"
+            self._name = f"{self.prefix}_{stamp}_{(session_id or '')[:8]}"
+            # pre-roll already contains the block that triggered the session
+            self._head = self.pre.view().copy()
+            self._chunks = deque()
+            self._post = []
+            self._samples = 0
+            self._post_left = -1
+        elif event_type == "end" and self._chunks is not None:
+            self._post_left = self.post_samples
+            if self._post_left <= 0:
+                self._finish()
+
+    def _finish(self) -> None:
+        audio = np.concatenate([self._head, *self._chunks, *self._post])
+        self._head = None
+        self._chunks = None
+        self._post = []
+        self._post_left = -1
+        try:
+            self._q.put_nowait((self._name, audio))
+        except queue.Full:
+            self.dropped += 1
+            if self.debug:
+                print(f"  -> CLIP DROPPED: {self._name} (writer busy)")
+
+    def close(self, timeout: float=10.0) -> None:
+        if self._chunks is not None:
+            self._finish()
+        try:
+            self._q.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _encode(self, path: Path, audio: np.ndarray) -> None:
+        if self._sf is not None:
+            self._sf.write(str(path), audio, self.sr, format="FLAC", subtype="PCM_16")
+            return
+        with wave.open(str(path), "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.sr)
+            w.writeframes(audio.astype("<i2", copy=False).tobytes())
+
+    def _run(self) -> None:
+        while True:
+            item = self._q.get()
+            if item is None:
+                return
+            name, audio = item
+            path = self.dir / f"{name}.{self.format}"
+            tmp = path.with_name(f".{path.name}.tmp")
+            try:
+                self._encode(tmp, audio)
+                os.replace(tmp, path)
+                self.written += 1
+                if self.debug:
+                    print(f"  -> CLIP {path} ({len(audio) / self.sr:.1f}s)")
+                self._evict()
+            except Exception as e:
+                print(f"⚠️  clip {path}: {e}")
+                try:
+                    tmp.unlink()
+                except OSError:
+                    pass
+
+    def _evict(self) -> None:
+        files = []
+        for p in self.dir.iterdir():
+            if p.suffix in CLIP_SUFFIXES and not p.name.startswith("."):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, p))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        cutoff = time.time() - self.max_age_sec
+        for mtime, size, p in files:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            total -= size
+
+class StreamDetector:
+    """Detector state for one input: resampling, frame window, gating, debounce and sessions.
+
+    ``feed()`` takes a capture block and returns the frame to run through the
+    model, or None when the block is gated or skipped by the stride scheduler;
+    ``complete()`` takes the model output for that frame (nothing for a skipped
+    block) and advances debounce and the session state machine. Keeping the two
+    apart lets several streams share one Model and batch their frames.
+    """
+
+    def __init__(self, cfg: Cfg, model: Model, idx: LabelIndex, source, *, on_event, on_status=None, gate: Optional[EnergyGate]=None, sessions: bool=True, debug: bool=False):
+        self.cfg = cfg
+        self.model = model
+        self.idx = idx
+        self.source = source
+        self.on_status = on_status
+        self.gate = gate
+        self.debug = debug
+        self.label = f"[{cfg.stream_name}] " if cfg.stream_name else ""
+
+        self.scorer = Scorer.from_cfg(cfg, idx)
+        self.resampler = StreamResampler(source.in_sr, cfg.target_sr, source.block_len)
+        self.schedule = StrideScheduler.from_cfg(cfg)
+        block_len_16k = int(math.ceil(source.block_len * cfg.target_sr / source.in_sr)) + 1
+        self.ring = RingBuffer(cfg.frame_len + self.schedule.history(block_len_16k))
+        self.log = BlockLog.from_cfg(cfg, self.scorer, idx) if debug and cfg.log_format == "json" else None
+        self.clips = ClipRecorder(cfg, debug=debug) if cfg.clips_enabled else None
+        self.agc = AutoGain.from_cfg(cfg)
+        if self.log is not None or self.clips is not None:
+            sink = on_event
+
+            def on_event(event_type, intensity, session_id, now):
+                if self.log is not None:
+                    self.log.event(event_type, intensity, session_id, now)
+                if self.clips is not None:
+                    self.clips.event(event_type, intensity, session_id, now)
+                sink(event_type, intensity, session_id, now)
+        self.session = SessionTracker.from_cfg(cfg, on_event, clock=source.now, sessions=sessions)
+
+        self.last_status_ts = 0.0
+        self.blocks = 0
+        self.signal = 0.0
+        self.now = source.now()
+        self._gated = False
+
+    def _signal(self, scores: np.ndarray, head_score: float):
+        signal, suppressed = self.scorer.score(scores)
+        if self.model.head is not None:
+            signal = max(signal, self.cfg.head_weight * head_score)
+        return signal, suppressed
+
+    def feed(self, audio: np.ndarray) -> Optional[np.ndarray]:
+        cfg = self.cfg
+        self.blocks += 1
+        if self.agc is not None:
+            self.agc.process(audio, frozen=self.session.in_session)
+        elif cfg.mic_gain != 1.0:
+            np.multiply(audio, cfg.mic_gain, out=audio)
+            np.clip(audio, -1.0, 1.0, out=audio)
+
+        audio_16k = audio if self.resampler.passthrough else self.resampler.process(audio)
+        self.ring.write(audio_16k)
+        if self.clips is not None:
+            self.clips.write(audio_16k)
+
+        self._gated = False
+        gate = self.gate
+        if gate is not None:
+            gate.blocks += 1
+            # the gate keeps tracking levels during a session but never skips it
+            if not gate.update(audio_16k) and not self.session.in_session:
+                gate.skipped += 1
+                self._gated = True
+
+        self.now = self.source.now()
+        if self._gated:
+            self.schedule.gated()
+            return None
+        if self.schedule.due(self.session.in_session, len(audio_16k)):
+            return self.ring.view(cfg.frame_len)
+        return None
+
+    def complete(self, scores: Optional[np.ndarray]=None, head_score: float=0.0) -> None:
+        cfg = self.cfg
+        now = self.now
+        signal, suppressed = 0.0, True
+        backfilled = []
+        if scores is not None:
+            signal, suppressed = self._signal(scores, head_score)
+            if signal >= cfg.thresh and not suppressed:
+                skipped = self.schedule.backfill()
+                if skipped:
+                    scores = scores.copy()
+                    for back, age in skipped:
+                        s, sup = self._signal(self.model.infer(self.ring.view(cfg.frame_len, back)), self.model.head_score)
+                        if s >= cfg.thresh and not sup:
+                            backfilled.append(age)
+
+        if scores is not None:
+            self.signal = signal
+        is_hit = (signal >= cfg.thresh) and not suppressed
+        hit_count = self.schedule.update(now, is_hit, backfilled)
+        debounced = hit_count >= cfg.debounce_k
+
+        if self.log is not None:
+            self.log.block(now, signal, scores, hit_count, is_hit, self.session.in_session, self._gated)
+        elif self.debug:
+            stamp = f"{self.label}{self.source.stamp(now)}"
+            if self._gated:
+                if not cfg.print_only_hits:
+                    print(f"{stamp} gated rms={self.gate.rms_db:.1f}dB flux={self.gate.flux:.2f}")
+            elif scores is None:
+                pass
+            elif (not cfg.print_only_hits) or debounced or self.session.in_session:
+                top_i = int(np.argmax(scores))
+                print(f"{stamp} {self.scorer.describe(scores)} sig={signal:.3f} int={score_to_intensity(signal):2d} top={self.idx.names[top_i]}({float(scores[top_i]):.3f}) hits={hit_count}/{cfg.debounce_n}")
+
+        if self.session.update(debounced, signal, now) == "end":
+            self.schedule.clear()
+
+        if self.on_status is not None and cfg.status_heartbeat_sec > 0:
+            if (now - self.last_status_ts) >= cfg.status_heartbeat_sec:
+                self.on_status(self.session.in_session, now)
+                self.last_status_ts = now
+
+    def close(self) -> dict:
+        # input ended mid-session
+        self.session.end(self.now)
+        if self.log is not None:
+            self.log.flush(self.now)
+        if self.clips is not None:
+            self.clips.close()
+        return {"blocks": self.blocks, "inferences": self.schedule.inferences, "sessions": self.session.started}
+
+def detect(cfg: Cfg, model: Model, idx: LabelIndex, source, *, on_event, on_status=None, gate: Optional[EnergyGate]=None, sessions: bool=True, debug: bool=False) -> dict:
+    det = StreamDetector(cfg, model, idx, source, on_event=on_event, on_status=on_status, gate=gate, sessions=sessions, debug=debug)
+    for audio in source.blocks():
+        frame = det.feed(audio)
+        if frame is None:
+            det.complete()
+        else:
+            scores = model.infer(frame)
+            det.complete(scores, model.head_score)
+    return det.close()
+
+class Metrics:
+    """Prometheus text exposition of the detector's counters.
+
+    Nothing is updated on the audio path for this: the detectors, capture
+    queues and deliveries already keep their counters, and ``render()`` reads
+    them at scrape time. Latencies come from the histograms kept by Model and
+    Delivery.
+    """
+
+    def __init__(self, model: Model):
+        self.model = model
+        self.streams = []
+        self.started = time.time()
+
+    def add_stream(self, det: StreamDetector, delivery: Optional[Delivery]=None) -> None:
+        self.streams.append((det, delivery))
+
+    def render(self) -> str:
+        out = []
+
+        def metric(name: str, kind: str, help_text: str, samples) -> None:
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                out.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+        streams = [(f'stream="{d.cfg.stream_name}",dog_id="{d.cfg.dog_id}"', d, dl) for d, dl in self.streams]
+        metric("barksignal_start_time_seconds", "gauge", "Detector start time (unix seconds).", [("", f"{self.started:.0f}")])
+        out.append("# HELP barksignal_inference_seconds Model invocation time per frame.")
+        out.append("# TYPE barksignal_inference_seconds histogram")
+        out.extend(self.model.latency.lines("barksignal_inference_seconds"))
+        metric("barksignal_blocks_total", "counter", "Capture blocks processed.", [(l, d.blocks) for l, d, _ in streams])
+        metric("barksignal_inferences_total", "counter", "Frames run through the model.", [(l, d.schedule.inferences) for l, d, _ in streams])
+        skipped = []
+        for l, d, _ in streams:
+            skipped.append((f'{l},reason="stride"', d.schedule.skipped))
+            if d.gate is not None:
+                skipped.append((f'{l},reason="gate"', d.gate.skipped))
+        metric("barksignal_blocks_skipped_total", "counter", "Blocks not run through the model.", skipped)
+        metric("barksignal_signal", "gauge", "Bark signal of the latest inference.", [(l, f"{d.signal:.4f}") for l, d, _ in streams])
+        metric("barksignal_input_gain", "gauge", "Gain applied to the input (AGC or mic_gain).", [(l, f"{d.agc.gain if d.agc is not None else d.cfg.mic_gain:.3f}") for l, d, _ in streams])
+        metric("barksignal_session_active", "gauge", "1 while a bark session is open.", [(l, int(d.session.in_session)) for l, d, _ in streams])
+        metric("barksignal_sessions_started_total", "counter", "Bark sessions started.", [(l, d.session.started) for l, d, _ in streams])
+        metric("barksignal_sessions_ended_total", "counter", "Bark sessions ended.", [(l, d.session.ended) for l, d, _ in streams])
+
+        clips = [(l, d.clips) for l, d, _ in streams if d.clips is not None]
+        if clips:
+            metric("barksignal_clips_written_total", "counter", "Session audio clips written.", [(l, c.written) for l, c in clips])
+            metric("barksignal_clips_dropped_total", "counter", "Session audio clips dropped because the writer was busy.", [(l, c.dropped) for l, c in clips])
+
+        captures = [(l, d.source.capture) for l, d, _ in streams if hasattr(d.source, "capture")]
+        metric("barksignal_capture_overflows_total", "counter", "PortAudio input overflows.", [(l, c.overflows) for l, c in captures])
+        metric("barksignal_capture_dropped_total", "counter", "Blocks dropped because the capture queue was full.", [(l, c.dropped) for l, c in captures])
+        metric("barksignal_capture_queue_depth", "gauge", "Capture blocks waiting for the detector.", [(l, c.depth) for l, c in captures])
+
+        deliveries = [(l, dl) for l, _, dl in streams if dl is not None]
+        metric("barksignal_webhook_delivered_total", "counter", "Payloads delivered.", [(l, dl.delivered) for l, dl in deliveries])
+        metric("barksignal_webhook_failed_total", "counter", "Failed delivery attempts.", [(l, dl.failed) for l, dl in deliveries])
+        metric("barksignal_webhook_dropped_total", "counter", "Payloads dropped because the send queue was full.", [(l, dl.dropped) for l, dl in deliveries])
+        metric("barksignal_delivery_queue_depth", "gauge", "Payloads waiting in the send queue.", [(l, dl.depth) for l, dl in deliveries])
+        metric("barksignal_outbox_pending", "gauge", "Events in the outbox awaiting delivery.", [(l, len(dl.outbox.pending) if dl.outbox is not None else 0) for l, dl in deliveries])
+        metric("barksignal_outbox_dropped_total", "counter", "Outbox events dropped (rejected by the platform or outbox full).", [(l, dl.outbox.dropped if dl.outbox is not None else 0) for l, dl in deliveries])
+        out.append("# HELP barksignal_webhook_latency_seconds Time from queueing to the delivery outcome.")
+        out.append("# TYPE barksignal_webhook_latency_seconds histogram")
+        for l, dl in deliveries:
+            out.extend(dl.latency.lines("barksignal_webhook_latency_seconds", l))
+        return "\n".join(out) + "\n"
+
+    def serve(self, bind: str, port: int) -> ThreadingHTTPServer:
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((bind, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="barksignal-metrics", daemon=True).start()
+        return server
+
+    def write_textfile(self, path: str, interval_sec: float) -> None:
+        """Rewrites ``path`` every ``interval_sec`` for node_exporter's textfile collector."""
+        def run():
+            p = Path(path)
+            while True:
+                try:
+                    write_atomic(p, self.render())
+                except OSError as e:
+                    print(f"⚠️  metrics textfile {p}: {e}")
+                time.sleep(max(1.0, interval_sec))
+
+        threading.Thread(target=run, name="barksignal-metrics-textfile", daemon=True).start()
+
+def run_streams(model: Model, detectors: list, ready: threading.Event) -> None:
+    """Serve several live inputs from one thread.
+
+    Every round takes the queued blocks of all inputs, runs the frames that are
+    due through the model in one batch and then advances each stream.
+    """
+    with ExitStack() as stack:
+        for det in detectors:
+            stack.enter_context(det.source.stream())
+        last_block = [time.monotonic()] * len(detectors)
+        stall_sec = min(det.source.stall_sec for det in detectors)
+        while True:
+            ready.clear()
+            due = []
+            idle = []
+            for i, det in enumerate(detectors):
+                capture = det.source.capture
+                if capture.depth == 0:
+                    if time.monotonic() - last_block[i] > det.source.stall_sec:
+                        raise RuntimeError(f"No audio from input device {det.source.device} for {det.source.stall_sec:.0f}s")
+                    continue
+                frame = det.feed(capture.get(0))
+                capture.release()
+                last_block[i] = time.monotonic()
+                if frame is None:
+                    idle.append(det)
+                else:
+                    due.append((det, frame))
+            if not due and not idle:
+                ready.wait(stall_sec)
+                continue
+            if due:
+                for (det, _), (scores, head_score) in zip(due, model.infer_many([f for _, f in due])):
+                    det.complete(scores, head_score)
+            for det in idle:
+                det.complete()
+
+def run_live(cfg: Cfg, model: Model, idx: LabelIndex, *, debug: bool=False) -> None:
+    ready = threading.Event()
+    deliveries = []
+    detectors = []
+    try:
+        for scfg in stream_cfgs(cfg):
+            detectors.append(live_detector(scfg, model, idx, ready, deliveries, debug=debug))
+        if cfg.metrics_port or cfg.metrics_textfile:
+            metrics = Metrics(model)
+            for det, delivery in zip(detectors, deliveries):
+                metrics.add_stream(det, delivery)
+            if cfg.metrics_port:
+                metrics.serve(cfg.metrics_bind, cfg.metrics_port)
+            if cfg.metrics_textfile:
+                metrics.write_textfile(cfg.metrics_textfile, cfg.metrics_interval_sec)
+        model.batch_rows = len(detectors)
+        run_streams(model, detectors, ready)
+    finally:
+        for delivery in deliveries:
+            delivery.stop()
+
+def live_detector(cfg: Cfg, model: Model, idx: LabelIndex, ready: threading.Event, deliveries: list, *, debug: bool=False) -> StreamDetector:
+    source = LiveSource(cfg, ready)
+    outbox = None
+    if cfg.outbox_path:
+        try:
+            outbox = Outbox(cfg.outbox_path, max_events=cfg.outbox_max_events)
+        except OSError as e:
+            print(f"⚠️  outbox disabled: {e}")
+    delivery = Delivery(cfg, outbox=outbox, debug=debug).start()
+    deliveries.append(delivery)
+    gate = EnergyGate.from_cfg(cfg)
+    demo = cfg.dog_id.upper() == "DEMO"
+    label = f"[{cfg.stream_name}] " if cfg.stream_name else ""
+
+    def on_event(event_type, intensity, session_id, now):
+        delivery.submit_event(event_payload(cfg, intensity, session_id=session_id, event_type=event_type, at=now))
+
+    def on_status(session_active, now):
+        delivery.submit_heartbeat(heartbeat_payload(cfg, session_active=session_active))
+        if cfg.throttle_factor > 0 and model.throttled(cfg.throttle_factor):
+            temp = read_soc_temp()
+            print(
+                f"⚠️  inference slowed down: {model.invoke_ema * 1e3:.1f}ms vs {model.baseline_sec * 1e3:.1f}ms at startup"
+                + (f" (SoC {temp:.1f}°C)" if temp is not None else "")
+            )
+        if debug and cfg.log_format == "json":
+            rec = {"t": round(now, 3), "kind": "status", "capture": source.capture.stats(), "delivery": delivery.stats()}
+            if gate is not None:
+                rec["gate"] = gate.stats()
+            if cfg.stream_name:
+                rec["stream"] = cfg.stream_name
+            print(json.dumps(rec, separators=(",", ":")))
+        elif debug:
+            print(f"{label}  capture {source.capture.stats()}")
+            if gate is not None:
+                print(f"{label}  gate {gate.stats()}")
+            print(f"{label}  delivery {delivery.stats()}")
+
+    return StreamDetector(
+        cfg, model, idx, source,
+        on_event=on_event,
+        on_status=None if demo else on_status,
+        gate=gate,
+        sessions=not demo,
+        debug=debug,
+    )
+
+def calibrate(cfg: Cfg, model: Model, idx: LabelIndex, source, *, margin: float=0.1, min_thresh: float=0.2) -> dict:
+    """Measures the ambient level and model response of an input without barking.
+
+    Returns the noise floor (10th percentile block RMS) and peak (99.9th
+    percentile sample) in dBFS, the mic_gain that puts the floor at
+    ``target_floor_db`` without clipping the peaks, and a threshold ``margin``
+    above the 99.5th percentile of the ambient bark signal at that gain.
+    """
+    scorer = Scorer.from_cfg(cfg, idx)
+    resampler = StreamResampler(source.in_sr, cfg.target_sr, source.block_len)
+    max_blocks = max(1, int(round(cfg.calibration_sec / cfg.block_sec)))
+    levels = []
+    peaks = []
+    chunks = []
+    for audio in source.blocks():
+        n = len(audio)
+        levels.append(10.0 * math.log10(float(np.dot(audio, audio)) / max(1, n) + 1e-12))
+        peaks.append(float(np.max(np.abs(audio))) if n else 0.0)
+        chunks.append(np.array(audio if resampler.passthrough else resampler.process(audio), dtype=np.float32))
+        if len(levels) >= max_blocks:
+            break
+    if not levels:
+        raise RuntimeError("No audio captured for calibration")
+
+    floor_db = float(np.percentile(levels, 10))
+    peak = float(np.percentile(peaks, 99.9))
+    gain = 10.0 ** ((cfg.target_floor_db - floor_db) / 20.0)
+    if peak > 0:
+        # keep 6 dB of headroom above the loudest ambient peaks
+        gain = min(gain, 0.5 / peak)
+    gain = min(cfg.agc_max_gain, max(cfg.agc_min_gain, gain))
+
+    audio = np.concatenate(chunks)
+    np.multiply(audio, gain, out=audio)
+    np.clip(audio, -1.0, 1.0, out=audio)
+    hop = max(1, len(chunks[0]))
+    signals = []
+    for end in range(cfg.frame_len, len(audio) + 1, hop):
+        scores = model.infer(audio[end - cfg.frame_len:end])
+        signal, suppressed = scorer.score(scores)
+        if model.head is not None:
+            signal = max(signal, cfg.head_weight * model.head_score)
+        signals.append(0.0 if suppressed else signal)
+    ambient = float(np.percentile(signals, 99.5)) if signals else 0.0
+
+    return {
+        "input_device": cfg.input_device,
+        "mic_gain": round(gain, 3),
+        "thresh": round(min(0.9, max(min_thresh, ambient + margin)), 3),
+        "noise_floor_db": round(floor_db, 1),
+        "peak_db": round(20.0 * math.log10(peak + 1e-12), 1),
+        "ambient_signal": round(ambient, 3),
+        "seconds": round(len(levels) * cfg.block_sec, 1),
+        "measured_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+def save_calibration(cfg: Cfg, entries: dict) -> Path:
+    p = Path(cfg.calibration_path).expanduser()
+    streams = load_calibration(cfg)
+    streams.update(entries)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(p, json.dumps({"streams": streams}, indent=2) + "\n")
+    return p
+
+def run_replay(cfg: Cfg, model: Model, idx: LabelIndex, path: Path, *, output: Optional[str]=None, debug: bool=False) -> None:
+    files = audio_files(path)
+    if not files:
+        raise RuntimeError(f"No audio files found in {path}")
+    out = open(output, "w") if output else sys.stdout
+    # keep stdout parseable JSONL: debug lines go to stderr when events use stdout
+    debug_out = sys.stderr if out is sys.stdout else sys.stdout
+    total_audio = 0.0
+    total_wall = 0.0
+    total_blocks = 0
+    total_skipped = 0
+    try:
+        for f in files:
+            source = FileSource(f, cfg)
+
+            def on_event(event_type, intensity, session_id, now):
+                out.write(json.dumps({
+                    "file": str(f),
+                    "t": round(now, 3),
+                    "type": event_type,
+                    "session_id": session_id,
+                    "intensity": int(intensity),
+                }) + "\n")
+
+            gate = EnergyGate.from_cfg(cfg)
+            t0 = time.monotonic()
+            with redirect_stdout(debug_out):
+                stats = detect(cfg, model, idx, source, on_event=on_event, gate=gate, debug=debug)
+            wall = time.monotonic() - t0
+            audio_sec = source.now()
+            total_audio += audio_sec
+            total_wall += wall
+            total_blocks += stats["blocks"]
+            gated = ""
+            if gate is not None:
+                total_skipped += gate.skipped
+                gated = f", {gate.stats()['skipped_pct']}% skipped by gate"
+            print(
+                f"{f}: {audio_sec:.1f}s audio in {wall:.1f}s ({audio_sec / max(wall, 1e-9):.1f}x realtime), "
+                f"{stats['blocks']} blocks, {stats['inferences']} inferences, {stats['sessions']} sessions{gated}",
+                file=sys.stderr,
+            )
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if len(files) > 1:
+        gated = f", {100.0 * total_skipped / max(1, total_blocks):.1f}% skipped by gate" if cfg.gate_enabled else ""
+        print(f"total: {total_audio:.1f}s audio in {total_wall:.1f}s ({total_audio / max(total_wall, 1e-9):.1f}x realtime){gated}", file=sys.stderr)
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--config", default="config.ini")
     ap.add_argument("--debug", action="store_true")
+    ap.add_argument("--input-file", help="replay a WAV/FLAC file, or every audio file in a directory, instead of the microphone")
+    ap.add_argument("--output", help="with --input-file: write session events as JSONL here instead of stdout")
+    ap.add_argument("--thresh", type=float, help="override [detect] thresh")
+    ap.add_argument("--debounce-k", type=int, help="override [detect] debounce_k")
+    ap.add_argument("--debounce-n", type=int, help="override [detect] debounce_n")
+    ap.add_argument("--bench-model", action="store_true", help="time the model with each thread count / backend and exit")
+    ap.add_argument("--compare-models", action="store_true", help="with --input-file: compare every configured model variant against the float model")
+    ap.add_argument("--calibrate", action="store_true", help="measure the noise floor of each input (keep the dog quiet), save a recommended mic_gain and thresh, and exit")
     args = ap.parse_args()
     debug = bool(args.debug)
 
     cfg = load_config(args.config)
+    overrides = {
+        "thresh": args.thresh,
+        "debounce_k": args.debounce_k,
+        "debounce_n": args.debounce_n,
+    }
+    overrides = {k: v for k, v in overrides.items() if v is not None}
+    # command-line values beat calibration just like config.ini values do
+    cfg = replace(cfg, explicit=cfg.explicit + tuple(overrides), **overrides)
+    calibrated = calibration_for(cfg)
+    cfg = replace(cfg, calibrated=tuple(calibrated), **calibrated)
     if cfg.dog_id.upper() == "DEMO":
         # Still run (useful for tuning), but won't send events
         pass
 
-    labels = load_labels(cfg.labels_url)
-    idx_bark = labels.index("Bark")
-    idx_dog  = labels.index("Dog")
-    idx_pets = labels.index("Domestic animals, pets")
-    idx_anml = labels.index("Animal")
+    if args.bench_model:
+        bench_backends(cfg)
+        return
 
-    itp = Interpreter(model_path=str(Path(cfg.model_path).expanduser()))
-    itp.allocate_tensors()
-    inp = itp.get_input_details()[0]
-    out = itp.get_output_details()[0]
-    in_shape = tuple(inp["shape"])
-    if in_shape not in [(cfg.frame_len,), (1, cfg.frame_len)]:
-        raise RuntimeError(f"Unexpected input shape {inp['shape']}")
+    idx = LabelIndex.from_labels(load_labels(cfg.labels_url, cfg.labels_path))
 
-    if debug:
-        print("✅ Detector started")
-        print(f"dog_id={cfg.dog_id}")
-        print(f"webhook={webhook_url(cfg)}")
-        print(f"Input: {inp['shape']} Output: {out['shape']}")
-        print(f"THRESH={cfg.thresh} debounce={cfg.debounce_k}/{cfg.debounce_n} heartbeat={cfg.heartbeat_sec}s end={cfg.bark_end_sec}s")
-        print(f"STATUS_HEARTBEAT={cfg.status_heartbeat_sec}s heartbeat_url={heartbeat_url(cfg)}")
-        print(f"INPUT_DEVICE={cfg.input_device} MIC_GAIN={cfg.mic_gain}")
-
-    info = sd.query_devices(cfg.input_device, "input")
-    in_sr = int(info["default_samplerate"])
-    ring = np.zeros(cfg.frame_len, dtype=np.float32)
-    hits = deque(maxlen=cfg.debounce_n)
-
-    in_session = False
-    session_id = None
-    last_hit_ts = 0.0
-    last_send_ts = 0.0
-    last_status_ts = 0.0
-    window_peak = 0.0
-    window_cnt = 0
-
-    block_in = max(1, int(in_sr * cfg.block_sec))
-
-    def update_ring(new_16k: np.ndarray):
-        nonlocal ring
-        n = len(new_16k)
-        if n >= cfg.frame_len:
-            ring = new_16k[-cfg.frame_len:].astype(np.float32)
-        else:
-            ring = np.roll(ring, -n)
-            ring[-n:] = new_16k.astype(np.float32)
+    if args.compare_models:
+        if not args.input_file:
+            ap.error("--compare-models needs --input-file")
+        compare_models(cfg, idx, Path(args.input_file).expanduser())
+        return
 
-    with sd.InputStream(device=cfg.input_device, samplerate=in_sr, channels=1, dtype="float32") as stream:
-        while True:
-            audio, _ = stream.read(block_in)
-            audio = audio.reshape(-1)
-            if cfg.mic_gain != 1.0:
-                audio = np.clip(audio * cfg.mic_gain, -1.0, 1.0)
+    # replaying to stdout: the JSONL events are the only thing written there
+    jsonl_stdout = bool(args.input_file) and not args.output and not args.calibrate
+    log_out = sys.stderr if jsonl_stdout else sys.stdout
+
+    with redirect_stdout(log_out):
+        model, w = select_model(cfg)
+    if w is not None:
+        print(f"model {Path(model.path).name} ({model.kind}): {model.backend}, warm-up p50={w['p50_ms']:.1f}ms max={w['max_ms']:.1f}ms first={w['first_ms']:.1f}ms", file=sys.stderr)
+    else:
+        print(f"model {Path(model.path).name} ({model.kind}): {model.backend}", file=sys.stderr)
+
+    if not args.calibrate:
+        for scfg in stream_cfgs(cfg) if cfg.streams else [cfg]:
+            if scfg.calibrated:
+                values = " ".join(f"{k}={getattr(scfg, k)}" for k in scfg.calibrated)
+                print(f"{scfg.stream_name or 'input'}: {values} from {cfg.calibration_path} (set them in config.ini to override)", file=sys.stderr)
 
-            if in_sr != cfg.target_sr:
-                audio_16k = resample_poly(audio, cfg.target_sr, in_sr).astype(np.float32)
+    if args.calibrate:
+        entries = {}
+        for scfg in stream_cfgs(cfg):
+            if args.input_file:
+                files = audio_files(Path(args.input_file).expanduser())
+                if not files:
+                    ap.error(f"No audio files found in {args.input_file}")
+                source = FileSource(files[0], scfg)
             else:
-                audio_16k = audio.astype(np.float32)
+                print(f"calibrating {scfg.stream_name or 'input'} (device {scfg.input_device}) for {scfg.calibration_sec:.0f}s ...", file=sys.stderr)
+                source = LiveSource(scfg)
+            entry = calibrate(scfg, model, idx, source)
+            entries[scfg.stream_name] = entry
+            print(
+                f"{scfg.stream_name or 'input'}: noise floor {entry['noise_floor_db']} dBFS, peak {entry['peak_db']} dBFS, "
+                f"ambient signal {entry['ambient_signal']} -> mic_gain={entry['mic_gain']} thresh={entry['thresh']}"
+            )
+        print(f"saved {save_calibration(cfg, entries)}")
+        return
 
-            update_ring(audio_16k)
+    if debug:
+        print("✅ Detector started", file=log_out)
+        print(f"dog_id={cfg.dog_id}", file=log_out)
+        print(f"webhook={webhook_url(cfg)}", file=log_out)
+        print(f"Input: {model.inp['shape']} Output: {model.out['shape']}", file=log_out)
+        print(f"THRESH={cfg.thresh} debounce={cfg.debounce_k}/{cfg.debounce_n} heartbeat={cfg.heartbeat_sec}s end={cfg.bark_end_sec}s", file=log_out)
+        print(f"STATUS_HEARTBEAT={cfg.status_heartbeat_sec}s heartbeat_url={heartbeat_url(cfg)}", file=log_out)
+        print(f"INPUT_DEVICE={cfg.input_device} MIC_GAIN={cfg.mic_gain}", file=log_out)
+        for scfg in stream_cfgs(cfg) if cfg.streams else ():
+            print(f"STREAM {scfg.stream_name}: dog_id={scfg.dog_id} INPUT_DEVICE={scfg.input_device} MIC_GAIN={scfg.mic_gain} THRESH={scfg.thresh}", file=log_out)
 
-            x = ring.astype(np.float32)
-            if in_shape == (1, cfg.frame_len):
-                x = x.reshape(1, cfg.frame_len)
+    if args.input_file:
+        run_replay(cfg, model, idx, Path(args.input_file).expanduser(), output=args.output, debug=debug)
+        return
 
-            itp.set_tensor(inp["index"], x)
-            itp.invoke()
-            scores = itp.get_tensor(out["index"])[0]
+    run_live(cfg, model, idx, debug=debug)
 
-            s_bark = float(scores[idx_bark])
-            s_dog  = float(scores[idx_dog])
-            s_pets = float(scores[idx_pets])
-            s_anml = float(scores[idx_anml])
+def compare_models(cfg: Cfg, idx: LabelIndex, path: Path) -> None:
+    paths = variant_paths(cfg)
+    if "float" not in paths:
+        raise RuntimeError(f"Reference float model {cfg.model_path} not found")
+    models = {name: Model(replace(cfg, model_path=p)) for name, p in paths.items()}
+    scorers = {name: Scorer.from_cfg(cfg, idx) for name in models}
+    times = {name: [] for name in models}
+    signals = {name: [] for name in models}
+    hits = {name: [] for name in models}
 
-            signal = max(
-                s_bark,
-                0.90 * s_dog,
-                0.60 * s_pets,
-                0.40 * s_anml,
-            )
-            intensity = score_to_intensity(signal)
+    for f in audio_files(path):
+        source = FileSource(f, cfg)
+        ring = RingBuffer(cfg.frame_len)
+        resampler = StreamResampler(source.in_sr, cfg.target_sr, source.block_len)
+        for audio in source.blocks():
+            if cfg.mic_gain != 1.0:
+                np.multiply(audio, cfg.mic_gain, out=audio)
+                np.clip(audio, -1.0, 1.0, out=audio)
+            ring.write(audio if resampler.passthrough else resampler.process(audio))
+            window = ring.view()
+            for name, model in models.items():
+                t0 = time.perf_counter()
+                scores = model.infer(window)
+                times[name].append(time.perf_counter() - t0)
+                signal, suppressed = scorers[name].score(scores)
+                if model.head is not None:
+                    signal = max(signal, cfg.head_weight * model.head_score)
+                signals[name].append(signal)
+                hits[name].append(signal >= cfg.thresh and not suppressed)
 
-            top_i = int(np.argmax(scores))
-            top_name = labels[top_i]
-            top_val = float(scores[top_i])
-
-            is_hit = (signal >= cfg.thresh) and (top_name != "Silence")
-            hits.append(1 if is_hit else 0)
-            hit_count = sum(hits)
-            debounced = hit_count >= cfg.debounce_k
-            now = time.time()
-
-            if debug:
-                if (not cfg.print_only_hits) or debounced or in_session:
-                    print(f"{time.strftime('%H:%M:%S')} bark={s_bark:.3f} dog={s_dog:.3f} pets={s_pets:.3f} anml={s_anml:.3f} sig={signal:.3f} int={intensity:2d} top={top_name}({top_val:.3f}) hits={hit_count}/{cfg.debounce_n}")
-
-            if debounced:
-                last_hit_ts = now
-                window_peak = max(window_peak, signal)
-                window_cnt += 1
-
-            if not in_session:
-                if debounced and cfg.dog_id.upper() != "DEMO":
-                    in_session = True
-                    session_id = str(uuid.uuid4())
-                    start_int = score_to_intensity(window_peak)
-                    send_event(cfg, start_int, session_id=session_id, event_type="start", debug=debug)
-                    last_send_ts = now
-                    window_peak = 0.0
-                    window_cnt = 0
-            else:
-                if debounced and (now - last_send_ts) >= cfg.heartbeat_sec:
-                    hb_int = score_to_intensity(window_peak)
-                    send_event(cfg, hb_int, session_id=session_id, event_type="heartbeat", debug=debug)
-                    last_send_ts = now
-                    window_peak = 0.0
-                    window_cnt = 0
-
-                if (now - last_hit_ts) >= cfg.bark_end_sec:
-                    end_int = score_to_intensity(window_peak) if window_cnt > 0 else 1
-                    send_event(cfg, end_int, session_id=session_id, event_type="end", debug=debug)
-                    in_session = False
-                    session_id = None
-                    hits.clear()
-                    window_peak = 0.0
-                    window_cnt = 0
-
-            if cfg.status_heartbeat_sec > 0 and cfg.dog_id.upper() != "DEMO":
-                if (now - last_status_ts) >= cfg.status_heartbeat_sec:
-                    send_heartbeat(cfg, session_active=in_session, debug=debug)
-                    last_status_ts = now
+    ref_sig = np.array(signals["float"])
+    ref_hit = np.array(hits["float"], dtype=bool)
+    print(f"{len(ref_sig)} blocks, reference = float ({cfg.model_path})")
+    print(f"{'variant':>8} {'p50 ms':>8} {'p99 ms':>8} {'sig MAE':>8} {'hit agree':>9} {'recall':>7} {'precision':>9}")
+    for name in models:
+        sig = np.array(signals[name])
+        hit = np.array(hits[name], dtype=bool)
+        tp = int(np.sum(hit & ref_hit))
+        recall = tp / max(1, int(ref_hit.sum()))
+        precision = tp / max(1, int(hit.sum()))
+        print(
+            f"{name:>8} {np.percentile(times[name], 50) * 1e3:8.1f} {np.percentile(times[name], 99) * 1e3:8.1f} "
+            f"{float(np.mean(np.abs(sig - ref_sig))):8.4f} {float(np.mean(hit == ref_hit)) * 100:8.1f}% "
+            f"{recall * 100:6.1f}% {precision * 100:8.1f}%"
+        )
+
+def bench_backends(cfg: Cfg) -> None:
+    cores = os.cpu_count() or 1
+    threads = sorted({1, 2, cores} | ({4} if cores >= 4 else set()))
+    for backend in ("xnnpack", "none"):
+        for n in threads:
+            try:
+                model = Model(replace(cfg, num_threads=n, delegate=backend))
+            except Exception as e:
+                print(f"{backend:>8} threads={n}: failed ({e})")
+                continue
+            w = model.warmup(max(cfg.warmup_runs, 20))
+            print(f"{model.backend:>24}: p50={w['p50_ms']:.1f}ms max={w['max_ms']:.1f}ms first={w['first_ms']:.1f}ms")
 
 if __name__ == "__main__":
     main()
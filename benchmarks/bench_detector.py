@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Per-stage latency and allocation benchmark for the detector block pipeline.
+
+Runs synthetic (or recorded, --wav) audio through the same components the
+detector uses -- gain/clip, StreamResampler, RingBuffer, the TFLite
+interpreter, Scorer and the StrideScheduler (idle stride, backfill and
+debounce) -- and reports p50/p99 per stage, end-to-end p50/p99 per block,
+headroom (block duration / p99), the share of blocks inferred and peak bytes
+allocated per block for every combination of input rate and block length.
+Model stages are only timed on blocks that were inferred.
+
+Without --model a stub interpreter with YAMNet's shapes is used, so the numbers
+cover everything except inference itself.
+
+Usage:
+  python benchmarks/bench_detector.py
+  python benchmarks/bench_detector.py --config config.ini --model yamnet.tflite --rates 44100,48000
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import bark_detector as bd  # noqa: E402
+
+STAGES = ("gain", "resample", "ring", "set_tensor", "invoke", "get_tensor", "scoring", "backfill", "debounce")
+
+
+class StubInterpreter:
+    """YAMNet-shaped stand-in whose scores follow the input level.
+
+    Quiet frames put ``silence`` on top (suppressed, no hit); the ``bark``
+    classes rise with the frame RMS between ``floor_db`` and ``floor_db + span_db``,
+    so synthetic bursts drive the scheduler through both its idle and hit paths.
+    """
+
+    def __init__(self, frame_len: int, bark=(), silence=(), n_classes: int = 521, floor_db: float = -24.0, span_db: float = 10.0):
+        self._inp = {"index": 0, "shape": np.array([frame_len]), "dtype": np.float32, "quantization": (0.0, 0)}
+        self._out = {"index": 1, "shape": np.array([1, n_classes]), "dtype": np.float32, "quantization": (0.0, 0)}
+        self._x = np.zeros(frame_len, dtype=np.float32)
+        self._base = np.random.default_rng(0).random((1, n_classes)).astype(np.float32) * 0.05
+        self._y = self._base.copy()
+        self._bark = np.array(bark, dtype=np.intp)
+        self._silence = np.array(silence, dtype=np.intp)
+        self._floor_db = floor_db
+        self._span_db = span_db
+
+    def allocate_tensors(self):
+        pass
+
+    def get_input_details(self):
+        return [self._inp]
+
+    def get_output_details(self):
+        return [self._out]
+
+    def set_tensor(self, index, x):
+        self._x[:] = x.reshape(-1)
+
+    def invoke(self):
+        level_db = 10.0 * np.log10(float(np.dot(self._x, self._x)) / len(self._x) + 1e-12)
+        level = min(1.0, max(0.0, (level_db - self._floor_db) / self._span_db))
+        self._y[:] = self._base
+        self._y[0, self._bark] = level
+        self._y[0, self._silence] = 1.0 - level
+
+    def get_tensor(self, index):
+        return self._y
+
+
+def synthetic_labels(cfg: bd.Cfg) -> list:
+    names = [f"class_{i}" for i in range(521)]
+    wanted = [name for name, _ in cfg.score_weights] + list(cfg.suppress_classes)
+    for i, name in enumerate(dict.fromkeys(wanted)):
+        names[i] = name
+    return names
+
+
+def default_cfg() -> bd.Cfg:
+    with tempfile.TemporaryDirectory() as d:
+        path = Path(d) / "config.ini"
+        path.write_text("[barksignal]\nmodel_path = yamnet.tflite\ndog_id = DEMO\nwebhook_url_template = http://localhost/{dog_id}\n")
+        return bd.load_config(str(path))
+
+
+def load_wav(path: str):
+    with wave.open(path, "rb") as w:
+        raw = w.readframes(w.getnframes())
+        return bd.pcm_to_float(raw, w.getsampwidth(), w.getnchannels()), w.getframerate()
+
+
+def make_audio(in_sr: int, seconds: float, wav=None) -> np.ndarray:
+    if wav is not None:
+        audio, sr = wav
+        if sr != in_sr:
+            # only used as benchmark input, quality does not matter
+            audio = np.interp(np.arange(0, len(audio), sr / in_sr), np.arange(len(audio)), audio).astype(np.float32)
+        reps = int(np.ceil(seconds * in_sr / max(1, len(audio))))
+        return np.tile(audio, reps)[: int(seconds * in_sr)]
+    rng = np.random.default_rng(1)
+    t = np.arange(int(seconds * in_sr)) / in_sr
+    # ~2 s tone bursts every 10 s over background noise: long quiet stretches
+    # run at the idle stride, the bursts at the fine stride with backfill
+    return (0.05 * rng.standard_normal(len(t)) + 0.3 * np.sin(2 * np.pi * 700 * t) * (np.sin(2 * np.pi * 0.1 * t) > 0.8)).astype(np.float32)
+
+
+class Pipeline:
+    """One detector block step with per-stage timing hooks."""
+
+    def __init__(self, cfg: bd.Cfg, model: bd.Model, idx: bd.LabelIndex, in_sr: int, block_len: int):
+        self.cfg = cfg
+        self.model = model
+        self.resampler = bd.StreamResampler(in_sr, cfg.target_sr, block_len)
+        self.schedule = bd.StrideScheduler.from_cfg(cfg)
+        block_len_16k = int(np.ceil(block_len * cfg.target_sr / in_sr)) + 1
+        self.ring = bd.RingBuffer(cfg.frame_len + self.schedule.history(block_len_16k))
+        self.scorer = bd.Scorer.from_cfg(cfg, idx)
+        self.gain = cfg.mic_gain if cfg.mic_gain != 1.0 else 1.5
+        self.now = 0.0
+
+    def step(self, audio: np.ndarray, t: dict) -> None:
+        clock = time.perf_counter
+        itp = self.model.itp
+        t0 = clock()
+        np.multiply(audio, self.gain, out=audio)
+        np.clip(audio, -1.0, 1.0, out=audio)
+        t1 = clock()
+        y = audio if self.resampler.passthrough else self.resampler.process(audio)
+        t2 = clock()
+        self.ring.write(y)
+        due = self.schedule.due(False, len(y))
+        x = self.ring.view(self.cfg.frame_len) if due else None
+        t3 = clock()
+        is_hit = False
+        ages = []
+        if due:
+            self.model.set_input(x)
+            t4 = clock()
+            itp.invoke()
+            t5 = clock()
+            scores = self.model.read_scores()
+            t6 = clock()
+            signal, suppressed = self.scorer.score(scores)
+            is_hit = signal >= self.cfg.thresh and not suppressed
+            t7 = clock()
+            if is_hit:
+                for back, age in self.schedule.backfill():
+                    s, sup = self.scorer.score(self.model.infer(self.ring.view(self.cfg.frame_len, back)))
+                    if s >= self.cfg.thresh and not sup:
+                        ages.append(age)
+            t7b = clock()
+        else:
+            t4 = t5 = t6 = t7 = t7b = t3
+        _ = self.schedule.update(self.now, is_hit, ages) >= self.cfg.debounce_k
+        self.now += self.cfg.block_sec
+        t8 = clock()
+        if t is not None:
+            t["gain"].append(t1 - t0)
+            t["resample"].append(t2 - t1)
+            t["ring"].append(t3 - t2)
+            if due:
+                t["set_tensor"].append(t4 - t3)
+                t["invoke"].append(t5 - t4)
+                t["get_tensor"].append(t6 - t5)
+                t["scoring"].append(t7 - t6)
+            if is_hit:
+                t["backfill"].append(t7b - t7)
+            t["debounce"].append(t8 - t7b)
+            t["total"].append(t8 - t0)
+
+
+def run_case(cfg, model, idx, in_sr: int, block_sec: float, n_blocks: int, wav) -> dict:
+    block_len = max(1, int(in_sr * block_sec))
+    audio = make_audio(in_sr, block_len * (n_blocks + 20) / in_sr, wav)
+    blocks = [audio[i * block_len:(i + 1) * block_len].copy() for i in range(n_blocks + 20)]
+    pipe = Pipeline(replace(cfg, block_sec=block_sec), model, idx, in_sr, block_len)
+
+    for b in blocks[:20]:
+        pipe.step(b.copy(), None)
+
+    t = {name: [] for name in STAGES + ("total",)}
+    for b in blocks[20:]:
+        pipe.step(b.copy(), t)
+
+    copies = [b.copy() for b in blocks[20:]]
+    tracemalloc.start()
+    peaks = []
+    for b in copies:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        pipe.step(b, None)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    res = {name: (np.percentile(v, 50), np.percentile(v, 99)) if v else (0.0, 0.0) for name, v in t.items()}
+    res["inferred"] = len(t["invoke"]) / max(1, len(t["total"]))
+    res["alloc"] = float(np.mean(peaks))
+    res["block_sec"] = block_len / in_sr
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--config", help="detector config.ini (scoring weights, frame_len, thresholds)")
+    ap.add_argument("--model", help="real .tflite model; default is a stub interpreter")
+    ap.add_argument("--wav", help="recorded audio to loop instead of synthetic input")
+    ap.add_argument("--rates", default="16000,44100,48000")
+    ap.add_argument("--block-secs", default="0.25,0.5")
+    ap.add_argument("--blocks", type=int, default=400)
+    args = ap.parse_args()
+
+    cfg = bd.load_config(args.config) if args.config else default_cfg()
+    if args.model:
+        cfg = replace(cfg, model_path=args.model)
+        model = bd.Model(cfg)
+        idx = bd.LabelIndex.from_labels(bd.load_labels(cfg.labels_url, cfg.labels_path))
+    else:
+        idx = bd.LabelIndex.from_labels(synthetic_labels(cfg))
+        bark = [idx.lookup(name) for name, _ in cfg.score_weights]
+        silence = [idx.lookup(name) for name in cfg.suppress_classes]
+        model = bd.Model(cfg, StubInterpreter(cfg.frame_len, bark, silence))
+    wav = load_wav(args.wav) if args.wav else None
+
+    rates = [int(r) for r in args.rates.split(",") if r]
+    block_secs = [float(b) for b in args.block_secs.split(",") if b]
+
+    print(f"model={'stub' if not args.model else args.model} frame_len={cfg.frame_len} target_sr={cfg.target_sr} blocks={args.blocks}")
+    print("times in microseconds, p50/p99")
+    header = f"{'in_sr':>6} {'block':>5} " + " ".join(f"{s:>15}" for s in STAGES) + f" {'total':>17} {'headroom':>8} {'inferred':>8} {'alloc/blk':>10}"
+    print(header)
+    for in_sr in rates:
+        for block_sec in block_secs:
+            r = run_case(cfg, model, idx, in_sr, block_sec, args.blocks, wav)
+            cells = " ".join(f"{r[s][0] * 1e6:7.0f}/{r[s][1] * 1e6:<7.0f}" for s in STAGES)
+            total = f"{r['total'][0] * 1e6:8.0f}/{r['total'][1] * 1e6:<8.0f}"
+            headroom = r["block_sec"] / max(r["total"][1], 1e-9)
+            print(f"{in_sr:>6} {block_sec:>5} {cells} {total} {headroom:7.1f}x {r['inferred'] * 100:7.0f}% {r['alloc']:9.0f}B")
+
+
+if __name__ == "__main__":
+    main()
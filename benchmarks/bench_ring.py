@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Per-block cost of the detector's sample window: np.roll vs RingBuffer.
+
+Usage: python benchmarks/bench_ring.py [--blocks 2000] [--frame-len 15600] [--block 4000]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from bark_detector import RingBuffer  # noqa: E402
+
+
+def legacy_factory(frame_len: int):
+    ring = np.zeros(frame_len, dtype=np.float32)
+
+    def step(new: np.ndarray) -> np.ndarray:
+        nonlocal ring
+        n = len(new)
+        if n >= frame_len:
+            ring = new[-frame_len:].astype(np.float32)
+        else:
+            ring = np.roll(ring, -n)
+            ring[-n:] = new.astype(np.float32)
+        return ring.astype(np.float32)
+
+    return step
+
+
+def ring_factory(frame_len: int):
+    ring = RingBuffer(frame_len)
+
+    def step(new: np.ndarray) -> np.ndarray:
+        ring.write(new)
+        return ring.view()
+
+    return step
+
+
+def measure(step, blocks: list) -> dict:
+    for b in blocks[:10]:
+        step(b)
+
+    t0 = time.perf_counter()
+    for b in blocks:
+        step(b)
+    elapsed = time.perf_counter() - t0
+
+    tracemalloc.start()
+    peaks = []
+    big = 0
+    for b in blocks:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        step(b)
+        peak = tracemalloc.get_traced_memory()[1] - base
+        peaks.append(peak)
+        # anything above 1 KiB can only be a sample buffer, not a view object
+        if peak >= 1024:
+            big += 1
+    tracemalloc.stop()
+
+    return {
+        "us_per_block": elapsed / len(blocks) * 1e6,
+        "peak_bytes_per_block": float(np.mean(peaks)),
+        "blocks_with_buffer_alloc": big,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--blocks", type=int, default=2000)
+    ap.add_argument("--frame-len", type=int, default=15600)
+    ap.add_argument("--block", type=int, default=4000, help="samples per block at 16 kHz")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    blocks = [rng.standard_normal(args.block).astype(np.float32) for _ in range(args.blocks)]
+
+    print(f"frame_len={args.frame_len} block={args.block} blocks={args.blocks}")
+    for name, factory in (("np.roll", legacy_factory), ("RingBuffer", ring_factory)):
+        r = measure(factory(args.frame_len), blocks)
+        print(
+            f"{name:>10}: {r['us_per_block']:8.1f} us/block  "
+            f"peak alloc {r['peak_bytes_per_block']:9.0f} B/block  "
+            f"buffer allocs in {r['blocks_with_buffer_alloc']}/{len(blocks)} blocks"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Drives synthetic score frames through the debounce window and SessionTracker.
+
+Simulates ``--hours`` of traffic at the detector's block rate on a fake clock
+(bursts of barking separated by quiet gaps, plus isolated false positives) and
+reports frames per second. Every emitted event is checked on the fly:
+
+- time never goes backwards;
+- each session is ``start`` -> ``heartbeat``* -> ``end`` with one session id;
+- sessions never overlap;
+- heartbeats are at least heartbeat_sec apart;
+- intensities stay within 1..10.
+
+Usage: python benchmarks/bench_sessions.py [--hours 24] [--config config.ini] [--seed 0]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import bark_detector as bd  # noqa: E402
+
+
+class Checker:
+    """Event sink that asserts start/heartbeat/end ordering."""
+
+    def __init__(self, heartbeat_sec: float):
+        self.heartbeat_sec = heartbeat_sec
+        self.session_id = None
+        self.last_t = float("-inf")
+        self.last_send = 0.0
+        self.counts = {"start": 0, "heartbeat": 0, "end": 0}
+
+    def __call__(self, event_type, intensity, session_id, now):
+        assert now >= self.last_t, f"time went backwards: {now} < {self.last_t}"
+        assert 1 <= intensity <= 10, f"intensity {intensity} out of range"
+        if event_type == "start":
+            assert self.session_id is None, f"start while {self.session_id} is open"
+            assert session_id, "start without session id"
+            self.session_id = session_id
+            self.last_send = now
+        else:
+            assert session_id == self.session_id, f"{event_type} for {session_id}, open session is {self.session_id}"
+            if event_type == "heartbeat":
+                assert now - self.last_send >= self.heartbeat_sec, "heartbeats too close together"
+                self.last_send = now
+            else:
+                self.session_id = None
+        self.last_t = now
+        self.counts[event_type] += 1
+
+
+def synthetic_signal(n: int, block_sec: float, rng) -> np.ndarray:
+    """Per-block bark signal: quiet background, barking bursts and stray spikes."""
+    sig = rng.random(n).astype(np.float32) * 0.2
+    i = 0
+    while i < n:
+        i += int(rng.exponential(600.0) / block_sec)
+        length = int(rng.uniform(0.5, 120.0) / block_sec)
+        burst = sig[i:i + length]
+        burst[rng.random(len(burst)) < 0.6] = rng.uniform(0.3, 1.0)
+        i += length
+    spikes = rng.random(n) < 0.002
+    sig[spikes] = 0.9
+    return sig
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--config", help="detector config.ini (debounce and session timing)")
+    ap.add_argument("--hours", type=float, default=24.0)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    if args.config:
+        cfg = bd.load_config(args.config)
+        block_sec, thresh, k, n = cfg.block_sec, cfg.thresh, cfg.debounce_k, cfg.debounce_n
+        heartbeat_sec, bark_end_sec = cfg.heartbeat_sec, cfg.bark_end_sec
+    else:
+        block_sec, thresh, k, n = 0.25, 0.30, 2, 3
+        heartbeat_sec, bark_end_sec = 20.0, 3.0
+
+    frames = int(args.hours * 3600 / block_sec)
+    signal = synthetic_signal(frames, block_sec, np.random.default_rng(args.seed))
+    hits = (signal >= thresh).tolist()
+    signal = signal.tolist()
+
+    ids = iter(range(1, frames + 2))
+    checker = Checker(heartbeat_sec)
+    window = bd.StrideScheduler(block_sec, 1.0, 0.0, k, n)
+    tracker = bd.SessionTracker(heartbeat_sec, bark_end_sec, checker, clock=lambda: 0.0, new_id=lambda: str(next(ids)))
+
+    t0 = time.perf_counter()
+    now = 0.0
+    for i in range(frames):
+        now = i * block_sec
+        debounced = window.update(now, hits[i]) >= k
+        if tracker.update(debounced, signal[i], now) == "end":
+            window.clear()
+    tracker.end(now)
+    elapsed = time.perf_counter() - t0
+
+    c = checker.counts
+    assert c["start"] == c["end"] == tracker.started, f"unbalanced sessions: {c}"
+    print(f"{frames} frames ({args.hours:g}h at {block_sec}s blocks) in {elapsed:.2f}s: {frames / elapsed / 1e3:.0f}k frames/s")
+    print(f"sessions={c['start']} heartbeats={c['heartbeat']} ordering OK")
+
+
+if __name__ == "__main__":
+    main()
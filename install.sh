@@ -65,6 +65,9 @@ download_yamnet() {
   if [[ ! -f "${APP_DIR}/yamnet.tflite" ]]; then
     sudo -u "${APP_USER}" curl -L "https://storage.googleapis.com/audioset/yamnet.tflite" -o "${APP_DIR}/yamnet.tflite"
   fi
+  if [[ ! -f "${APP_DIR}/yamnet_class_map.csv" ]]; then
+    sudo -u "${APP_USER}" curl -L "https://raw.githubusercontent.com/tensorflow/models/master/research/audioset/yamnet/yamnet_class_map.csv" -o "${APP_DIR}/yamnet_class_map.csv"
+  fi
 }
 
 install_scripts_services() {
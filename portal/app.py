@@ -6,6 +6,10 @@ import configparser
 import json
 import base64
 import io
+import re
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
 
 import requests
@@ -20,6 +24,18 @@ FLAG_DOG  = Path("/home/barksignal/barksignal/.dog_configured")
 PAIRING_STATE_PATH = Path("/home/barksignal/barksignal/.pairing_state.json")
 HEARTBEAT_STATE_PATH = Path("/home/barksignal/barksignal-data/last_heartbeat.json")
 
+WIFI_SCAN_INTERVAL_SEC = 20
+WIFI_SCAN_TTL_SEC = 60
+NET_PROBE_INTERVAL_SEC = 15
+NET_PROBE_RETRY_SEC = 5
+NET_PROBE_MAX_BACKOFF_SEC = 60
+PAIRING_POLL_SEC = 3
+PAIRING_IDLE_POLL_SEC = 60
+PAIRING_MAX_BACKOFF_SEC = 60
+PAIRING_WATCH_SEC = 60
+PAIRING_LONGPOLL_SEC = 25
+PAIRING_MAX_WAITERS = 1
+
 CSS = """
 :root{
   --skyTop:#0b1a2b;
@@ -330,28 +346,95 @@ TPL = """
 {% if pairing_status == 'pending' %}
 <script>
   (function(){
+    var code = {{ (pairing_code or "") | tojson }};
+    var since = 0;
     function poll(){
-      fetch("/pairing/status")
+      // long-poll: the server holds the request until the state changes
+      fetch("/pairing/status?since=" + since)
         .then(function(r){return r.json();})
         .then(function(d){
-          if (d.status === "paired" || d.status === "expired") {
+          // any state other than the pending code shown here (paired, expired,
+          // error, offline, or a new code) needs a fresh render
+          if (d.status !== "pending" || (d.pairing_code || "") !== code) {
             window.location.reload();
             return;
           }
-          setTimeout(poll, 3000);
+          var changed = d.version !== since;
+          since = d.version;
+          setTimeout(poll, changed ? 0 : 3000);
         })
         .catch(function(){ setTimeout(poll, 5000); });
     }
-    setTimeout(poll, 3000);
+    poll();
   })();
 </script>
 {% endif %}
 </body></html>
 """
 
-def read_cfg():
+def atomic_write_text(path: Path, text: str) -> None:
+    # temp file + fsync + rename, so a power cut leaves the old or the new file, never half of one
+    target = path.resolve()
+    tmp = target.with_name(target.name + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    try:
+        os.chmod(tmp, target.stat().st_mode & 0o7777)
+    except OSError:
+        pass
+    os.replace(tmp, target)
+
+# config.ini is parsed once and re-read only when its inode/mtime/size changes
+# (an admin may edit it by hand, and barksignal-update.sh may replace it while
+# migrating releases; the detector only reads it). Readers share the
+# parsed copy; writers hold the lock, apply their keys to a fresh parse and
+# replace the file atomically.
+_config = {"key": None, "cp": None}
+_config_lock = threading.Lock()
+
+def _config_key():
+    try:
+        st = CONFIG_PATH.stat()
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def _parse_config() -> configparser.ConfigParser:
     cp = configparser.ConfigParser()
     cp.read(CONFIG_PATH)
+    return cp
+
+def load_config() -> configparser.ConfigParser:
+    key = _config_key()
+    if _config["cp"] is None or key != _config["key"]:
+        with _config_lock:
+            if _config["cp"] is None or key != _config["key"]:
+                _config.update({"key": key, "cp": _parse_config()})
+    return _config["cp"]
+
+def update_config(values: dict, section: str = "barksignal") -> None:
+    # one write for any number of keys; a value of None removes the key
+    with _config_lock:
+        cp = _parse_config()
+        if section not in cp:
+            cp[section] = {}
+        changed = False
+        for k, v in values.items():
+            if v is None:
+                changed |= cp[section].pop(k, None) is not None
+            elif cp[section].get(k) != v:
+                cp[section][k] = v
+                changed = True
+        if changed:
+            buf = io.StringIO()
+            cp.write(buf)
+            atomic_write_text(CONFIG_PATH, buf.getvalue())
+        _config.update({"key": _config_key(), "cp": cp})
+
+def read_cfg():
+    cp = load_config()
     def g(s,k,default=""):
         return cp.get(s,k,fallback=default)
     return {
@@ -364,42 +447,24 @@ def read_cfg():
         "pairing_status_path": g("barksignal","api_pairing_status_path","/api/pairing/status"),
         "device_unpair_path": g("barksignal","api_device_unpair_path","/api/device/unpair"),
         "pairing_web_path": g("barksignal","pairing_web_path","/pairing"),
+        "health_path": g("barksignal","api_health_path",""),
     }
 
 def write_dog_id(dog_id: str):
-    cp = configparser.ConfigParser()
-    cp.read(CONFIG_PATH)
-    if "barksignal" not in cp: cp["barksignal"] = {}
-    cp["barksignal"]["dog_id"] = dog_id
-    with open(CONFIG_PATH, "w") as f:
-        cp.write(f)
+    update_config({"dog_id": dog_id})
 
 def write_device_token(token: str):
-    cp = configparser.ConfigParser()
-    cp.read(CONFIG_PATH)
-    if "barksignal" not in cp: cp["barksignal"] = {}
-    cp["barksignal"]["api_token"] = token
-    with open(CONFIG_PATH, "w") as f:
-        cp.write(f)
+    update_config({"api_token": token})
 
 def read_device_token() -> str | None:
-    cp = configparser.ConfigParser()
-    cp.read(CONFIG_PATH)
-    tok = cp.get("barksignal", "api_token", fallback="").strip()
+    tok = load_config().get("barksignal", "api_token", fallback="").strip()
     return tok or None
 
 def clear_device_token() -> None:
-    cp = configparser.ConfigParser()
-    cp.read(CONFIG_PATH)
-    if "barksignal" in cp and "api_token" in cp["barksignal"]:
-        cp["barksignal"].pop("api_token", None)
-        with open(CONFIG_PATH, "w") as f:
-            cp.write(f)
+    update_config({"api_token": None})
 
 def read_dog_id() -> str | None:
-    cp = configparser.ConfigParser()
-    cp.read(CONFIG_PATH)
-    dog = cp.get("barksignal", "dog_id", fallback="").strip()
+    dog = load_config().get("barksignal", "dog_id", fallback="").strip()
     return dog or None
 
 def read_last_heartbeat() -> str | None:
@@ -412,47 +477,142 @@ def read_last_heartbeat() -> str | None:
     except Exception:
         return None
 
-def scan_ssids():
-    try:
-        out = subprocess.check_output(["nmcli","-t","-f","SSID","dev","wifi","list"], text=True)
-        ssids = sorted({x.strip() for x in out.splitlines() if x.strip()})
-        return ssids[:80] if ssids else []
-    except Exception:
-        return []
+# Wi-Fi scan results shared by all request threads; refreshed by a background
+# thread so page loads never wait for nmcli.
+_wifi_cache = {"at": 0.0, "ssids": [], "details": {}}
+_wifi_scan_lock = threading.Lock()
+_wifi_scanner_lock = threading.Lock()
+_wifi_scanner_started = False
+_wifi_caps = None
 
-def scan_wifi_details():
-    try:
-        out = subprocess.check_output(["nmcli","-t","-f","SSID,FREQ,SECURITY","dev","wifi","list"], text=True)
-    except Exception:
-        return {}
+def parse_wifi_list(out: str):
+    """Parses `nmcli -t -f SSID,FREQ,SECURITY,SIGNAL` into (SSIDs by best signal, details)."""
     details = {}
     for line in out.splitlines():
         if not line.strip():
             continue
-        parts = line.split(":")
-        if len(parts) < 3:
+        # terse mode escapes ':' inside values as '\:'
+        parts = [p.replace("\\:", ":") for p in re.split(r"(?<!\\):", line)]
+        if len(parts) < 4:
             continue
         ssid = parts[0].strip()
         if not ssid:
             continue
+        m = re.match(r"\s*(\d+)", parts[1])
+        freq = int(m.group(1)) if m else None
+        sec = parts[2].strip()
         try:
-            freq = int(parts[1])
+            signal = int(parts[3])
         except Exception:
-            freq = None
-        sec = parts[2].strip()
-        d = details.setdefault(ssid, {"freqs": [], "secs": []})
+            signal = 0
+        d = details.setdefault(ssid, {"freqs": [], "secs": [], "signal": 0})
         if freq:
             d["freqs"].append(freq)
         if sec:
             d["secs"].append(sec)
-    return details
+        d["signal"] = max(d["signal"], signal)
+    ssids = sorted(details, key=lambda s: (-details[s]["signal"], s.lower()))
+    return ssids[:80], details
+
+def refresh_wifi_scan() -> dict:
+    # single flight: callers arriving during a scan wait for it instead of starting another
+    if not _wifi_scan_lock.acquire(blocking=False):
+        with _wifi_scan_lock:
+            return _wifi_cache
+    try:
+        out = subprocess.check_output(
+            ["nmcli","-t","-f","SSID,FREQ,SECURITY,SIGNAL","dev","wifi","list"],
+            text=True,
+            timeout=20,
+        )
+        ssids, details = parse_wifi_list(out)
+        _wifi_cache.update({"at": time.monotonic(), "ssids": ssids, "details": details})
+    except Exception:
+        pass
+    finally:
+        _wifi_scan_lock.release()
+    return _wifi_cache
+
+def _wifi_scanner():
+    while True:
+        if not FLAG_WIFI.exists():
+            refresh_wifi_scan()
+        time.sleep(WIFI_SCAN_INTERVAL_SEC)
+
+def start_wifi_scanner() -> None:
+    global _wifi_scanner_started
+    with _wifi_scanner_lock:
+        if _wifi_scanner_started:
+            return
+        _wifi_scanner_started = True
+    threading.Thread(target=_wifi_scanner, name="wifi-scanner", daemon=True).start()
+
+def wifi_scan(max_age: float = WIFI_SCAN_TTL_SEC) -> dict:
+    start_wifi_scanner()
+    if time.monotonic() - _wifi_cache["at"] > max_age:
+        return refresh_wifi_scan()
+    return _wifi_cache
+
+def scan_ssids():
+    return list(wifi_scan()["ssids"])
+
+def scan_wifi_details():
+    return wifi_scan()["details"]
+
+# Last connectivity probe result, kept fresh by a background thread so request
+# handlers (and every open setup page polling /pairing/status) never hit the network.
+_net_state = {"ok": False, "at": 0.0, "url": None}
+_net_session = requests.Session()
+_net_monitor_lock = threading.Lock()
+_net_monitor_started = False
+
+def probe_url(api_base: str, health_path: str = "") -> str:
+    if not health_path:
+        return api_base
+    return api_base.rstrip("/") + "/" + health_path.lstrip("/")
 
-def has_internet(api_base: str) -> bool:
+def probe_internet(url: str) -> bool:
     try:
-        r = requests.get(api_base, timeout=2)
-        return r.status_code < 500
+        r = _net_session.head(url, timeout=2, allow_redirects=False)
+        if r.status_code == 405:
+            r = _net_session.get(url, timeout=2, stream=True)
+            r.close()
+        ok = r.status_code < 500
     except Exception:
-        return False
+        ok = False
+    _net_state.update({"ok": ok, "at": time.monotonic(), "url": url})
+    return ok
+
+def _net_monitor():
+    # steady interval while online; while offline retry quickly at first and
+    # back off so a dead uplink is not hammered every few seconds
+    backoff = NET_PROBE_RETRY_SEC
+    while True:
+        delay = NET_PROBE_INTERVAL_SEC
+        if FLAG_WIFI.exists():
+            cfg = read_cfg()
+            if probe_internet(probe_url(cfg["api_base"], cfg["health_path"])):
+                backoff = NET_PROBE_RETRY_SEC
+            else:
+                delay = backoff
+                backoff = min(backoff * 2, NET_PROBE_MAX_BACKOFF_SEC)
+        time.sleep(delay)
+
+def start_net_monitor() -> None:
+    global _net_monitor_started
+    with _net_monitor_lock:
+        if _net_monitor_started:
+            return
+        _net_monitor_started = True
+    threading.Thread(target=_net_monitor, name="net-monitor", daemon=True).start()
+
+def has_internet(api_base: str, health_path: str = "") -> bool:
+    start_net_monitor()
+    url = probe_url(api_base, health_path)
+    if _net_state["url"] != url:
+        # first call, or api_base changed in config.ini
+        return probe_internet(url)
+    return _net_state["ok"]
 
 def get_serial_number() -> str:
     try:
@@ -473,19 +633,29 @@ def get_serial_number() -> str:
         pass
     return subprocess.check_output(["hostname"], text=True).strip()
 
+# .pairing_state.json is read once and then served from memory; all writes
+# go through save/clear so the copy never goes stale.
+_pairing_state = {"loaded": False, "data": None}
+_pairing_state_lock = threading.Lock()
+
 def load_pairing_state() -> dict | None:
-    try:
-        if not PAIRING_STATE_PATH.exists():
-            return None
-        return json.loads(PAIRING_STATE_PATH.read_text())
-    except Exception:
-        return None
+    with _pairing_state_lock:
+        if not _pairing_state["loaded"]:
+            try:
+                data = json.loads(PAIRING_STATE_PATH.read_text()) if PAIRING_STATE_PATH.exists() else None
+            except Exception:
+                data = None
+            _pairing_state.update({"loaded": True, "data": data})
+        data = _pairing_state["data"]
+        return dict(data) if data else None
 
 def save_pairing_state(data: dict) -> None:
-    try:
-        PAIRING_STATE_PATH.write_text(json.dumps(data))
-    except Exception:
-        pass
+    with _pairing_state_lock:
+        _pairing_state.update({"loaded": True, "data": dict(data)})
+        try:
+            atomic_write_text(PAIRING_STATE_PATH, json.dumps(data))
+        except Exception:
+            pass
 
 def remove_state_path(path: Path) -> None:
     try:
@@ -504,10 +674,12 @@ def remove_state_path(path: Path) -> None:
         pass
 
 def clear_pairing_state() -> None:
-    try:
-        remove_state_path(PAIRING_STATE_PATH)
-    except Exception:
-        pass
+    with _pairing_state_lock:
+        _pairing_state.update({"loaded": True, "data": None})
+        try:
+            remove_state_path(PAIRING_STATE_PATH)
+        except Exception:
+            pass
 
 def make_qr_data_uri(text: str) -> str | None:
     try:
@@ -535,33 +707,67 @@ def api_pairing_status(api_base: str, status_path: str, signal_device_id: str, s
     r.raise_for_status()
     return r.json()
 
+_pairing_flight_lock = threading.Lock()
+_pairing_flight = {"result": None, "error": None}
+
 def ensure_pairing(cfg: dict) -> dict:
+    # single flight: concurrent callers share one upstream start/status call and its outcome
+    if not _pairing_flight_lock.acquire(blocking=False):
+        with _pairing_flight_lock:
+            if _pairing_flight["error"] is not None:
+                raise _pairing_flight["error"]
+            return dict(_pairing_flight["result"])
+    # the leader always publishes an outcome and releases the flight, whatever happens
+    result, error = None, RuntimeError("pairing check did not complete")
+    try:
+        result, error = _ensure_pairing(cfg), None
+    except Exception as e:
+        error = e
+    finally:
+        _pairing_flight.update({"result": result, "error": error})
+        _pairing_flight_lock.release()
+    if error is not None:
+        raise error
+    return dict(result)
+
+def _pairing_done(data: dict) -> dict:
+    dog_id = data.get("dog_id")
+    updates = {}
+    if dog_id:
+        updates["dog_id"] = dog_id
+    if data.get("device_token"):
+        updates["api_token"] = data["device_token"]
+    if updates:
+        update_config(updates)
+    if dog_id:
+        FLAG_DOG.write_text("ok")
+    clear_pairing_state()
+    return {"status": "paired", "dog_id": dog_id}
+
+def _ensure_pairing(cfg: dict) -> dict:
     dog_id = read_dog_id()
     if dog_id and dog_id.upper() != "DEMO":
         return {"status": "paired", "dog_id": dog_id}
 
-    state = load_pairing_state()
-    if not state:
-        data = api_pairing_start(cfg["api_base"], cfg["pairing_start_path"], get_serial_number())
-        if data.get("status") == "paired":
-            dog_id = data.get("dog_id")
-            if dog_id:
-                write_dog_id(dog_id)
-                FLAG_DOG.write_text("ok")
-            if data.get("device_token"):
-                write_device_token(data["device_token"])
-            return {"status": "paired", "dog_id": dog_id}
-        if data.get("status") == "pending":
+    # a code that expired is replaced by a new one at most once per call
+    for _ in range(2):
+        state = load_pairing_state()
+        if not state:
+            data = api_pairing_start(cfg["api_base"], cfg["pairing_start_path"], get_serial_number())
+            if data.get("status") == "paired":
+                return _pairing_done(data)
+            if data.get("status") != "pending":
+                return {"status": "error"}
             state = {
                 "signal_device_id": data.get("signal_device_id"),
                 "pairing_code": data.get("pairing_code"),
                 "expires_at": data.get("expires_at"),
             }
             save_pairing_state(state)
-        else:
-            return {"status": "error"}
 
-    if state and state.get("signal_device_id"):
+        if not state.get("signal_device_id"):
+            return {"status": "pending"}
+
         data = api_pairing_status(
             cfg["api_base"],
             cfg["pairing_status_path"],
@@ -569,30 +775,129 @@ def ensure_pairing(cfg: dict) -> dict:
             get_serial_number(),
         )
         if data.get("status") == "paired":
-            dog_id = data.get("dog_id")
-            if dog_id:
-                write_dog_id(dog_id)
-                FLAG_DOG.write_text("ok")
-            if data.get("device_token"):
-                write_device_token(data["device_token"])
-            clear_pairing_state()
-            return {"status": "paired", "dog_id": dog_id}
-        if data.get("status") == "expired":
-            clear_pairing_state()
-            # start a new code immediately
-            return ensure_pairing(cfg)
-        return {
-            "status": data.get("status", "pending"),
-            "pairing_code": state.get("pairing_code"),
-            "expires_at": state.get("expires_at"),
-        }
-
-    return {"status": "pending"}
+            return _pairing_done(data)
+        if data.get("status") != "expired":
+            return {
+                "status": data.get("status", "pending"),
+                "pairing_code": state.get("pairing_code"),
+                "expires_at": state.get("expires_at"),
+                "retry_after": data.get("retry_after"),
+            }
+        clear_pairing_state()
+
+    return {"status": "expired"}
+
+# Pairing state as seen by the one background poller. Browsers read it (or
+# long-poll for the next version) instead of each triggering upstream calls.
+_pairing = {"version": 0, "state": {"status": "pending"}, "stale": True}
+_pairing_cond = threading.Condition()
+_pairing_wake = threading.Event()
+_pairing_waiters = threading.BoundedSemaphore(PAIRING_MAX_WAITERS)
+_pairing_watch = {"at": float("-inf")}
+_pairing_poller_lock = threading.Lock()
+_pairing_poller_started = False
+
+def seconds_until(ts) -> float | None:
+    if ts in (None, ""):
+        return None
+    try:
+        if isinstance(ts, (int, float)) or str(ts).replace(".", "", 1).isdigit():
+            at = float(ts)
+        else:
+            at = datetime.fromisoformat(str(ts).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+    return at - time.time()
+
+def retry_after_sec(value) -> float | None:
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+def publish_pairing(state: dict) -> None:
+    with _pairing_cond:
+        if state != _pairing["state"] or _pairing["version"] == 0:
+            _pairing["version"] += 1
+            _pairing["state"] = state
+        _pairing["stale"] = False
+        _pairing_cond.notify_all()
+
+def invalidate_pairing() -> None:
+    # readers wait for the poller's next result rather than seeing the old one
+    with _pairing_cond:
+        _pairing["stale"] = True
+    _pairing_wake.set()
+
+def pairing_snapshot(since: int = 0, timeout: float = 0.0) -> tuple[int, dict]:
+    with _pairing_cond:
+        _pairing_cond.wait_for(lambda: not _pairing["stale"] and _pairing["version"] != since, timeout)
+        if _pairing["stale"] or _pairing["version"] == 0:
+            # an outdated result (e.g. "paired" right after unpairing) is never shown
+            return _pairing["version"], {"status": "pending"}
+        return _pairing["version"], dict(_pairing["state"])
+
+def _pairing_poll_once() -> tuple[dict, float | None]:
+    cfg = read_cfg()
+    if not FLAG_WIFI.exists():
+        return {"status": "no-wifi"}, PAIRING_IDLE_POLL_SEC
+    if not has_internet(cfg["api_base"], cfg["health_path"]):
+        return {"status": "offline"}, NET_PROBE_INTERVAL_SEC
+    state = ensure_pairing(cfg)
+    if state.get("status") == "paired":
+        return state, PAIRING_IDLE_POLL_SEC
+    delay = retry_after_sec(state.pop("retry_after", None)) or PAIRING_POLL_SEC
+    left = seconds_until(state.get("expires_at"))
+    if left is not None:
+        # ask again right after the code expires so a new one is shown promptly
+        delay = min(delay, max(1.0, left + 1.0))
+    return state, delay
+
+def _pairing_poller():
+    backoff = PAIRING_POLL_SEC
+    while True:
+        if time.monotonic() - _pairing_watch["at"] > PAIRING_WATCH_SEC:
+            # nobody is looking at the setup page: no upstream traffic
+            _pairing_wake.wait()
+        _pairing_wake.clear()
+        try:
+            state, delay = _pairing_poll_once()
+            backoff = PAIRING_POLL_SEC
+        except Exception as e:
+            state = {"status": "error"}
+            resp = getattr(e, "response", None)
+            delay = retry_after_sec(resp.headers.get("Retry-After")) if resp is not None else None
+            delay = delay or backoff
+            backoff = min(backoff * 2, PAIRING_MAX_BACKOFF_SEC)
+        publish_pairing(state)
+        _pairing_wake.wait(delay)
+
+def watch_pairing() -> None:
+    # called for every page view / status request; wakes an idle poller
+    global _pairing_poller_started
+    with _pairing_poller_lock:
+        if not _pairing_poller_started:
+            _pairing_poller_started = True
+            threading.Thread(target=_pairing_poller, name="pairing-poller", daemon=True).start()
+        idle = time.monotonic() - _pairing_watch["at"] > PAIRING_WATCH_SEC
+        _pairing_watch["at"] = time.monotonic()
+    if idle:
+        invalidate_pairing()
+
+def current_pairing() -> dict:
+    # never blocks: until the poller has a fresh result the page renders as
+    # pending and its script long-polls for the real state
+    watch_pairing()
+    return pairing_snapshot()[1]
 
 def get_wifi_caps():
+    # the adapter's capabilities cannot change while we run
+    global _wifi_caps
+    if _wifi_caps is not None:
+        return _wifi_caps
     caps = {"supports_5ghz": None, "supports_wpa3": None}
     try:
-        out = subprocess.check_output(["iw","list"], text=True)
+        out = subprocess.check_output(["iw","list"], text=True, timeout=10)
     except Exception:
         return caps
     freqs = []
@@ -610,6 +915,7 @@ def get_wifi_caps():
     if freqs:
         caps["supports_5ghz"] = any(f >= 5000 for f in freqs)
     caps["supports_wpa3"] = ("SAE" in out) or ("WPA3" in out)
+    _wifi_caps = caps
     return caps
 
 def preflight_wifi(ssid: str, psk: str):
@@ -619,6 +925,9 @@ def preflight_wifi(ssid: str, psk: str):
         return "WLAN Passwort muss mindestens 8 Zeichen lang sein."
 
     details = scan_wifi_details()
+    if ssid not in details:
+        # the network may have come up since the last background scan
+        details = refresh_wifi_scan()["details"]
     if ssid not in details:
         return f"SSID '{ssid}' wurde beim Scan nicht gefunden. Bitte SSID prüfen und erneut versuchen."
 
@@ -683,18 +992,16 @@ def api_device_unpair(api_base: str, unpair_path: str, token: str):
 
 @app.route("/", methods=["GET"])
 def index():
-    ssids = scan_ssids()
     cfg = read_cfg()
     wifi_configured = FLAG_WIFI.exists()
-    internet_ok = has_internet(cfg["api_base"]) if wifi_configured else False
+    # the SSID list is only shown in hotspot mode; never run nmcli otherwise
+    ssids = [] if wifi_configured else scan_ssids()
+    internet_ok = has_internet(cfg["api_base"], cfg["health_path"]) if wifi_configured else False
     last_heartbeat_at = read_last_heartbeat()
 
     pairing = {"status": "pending"}
     if wifi_configured and internet_ok:
-        try:
-            pairing = ensure_pairing(cfg)
-        except Exception:
-            pairing = {"status": "error"}
+        pairing = current_pairing()
 
     pairing_qr_url = None
     pairing_qr_data_uri = None
@@ -767,6 +1074,7 @@ def reset_wifi():
         pass
     remove_state_path(FLAG_WIFI)
     clear_pairing_state()
+    invalidate_pairing()
     session["wifi_msg"] = "WLAN-Konfiguration gelöscht. Hotspot wird wieder aktiv."
     return redirect("/")
 
@@ -774,7 +1082,7 @@ def reset_wifi():
 def unpair():
     cfg = read_cfg()
     wifi_configured = FLAG_WIFI.exists()
-    internet_ok = has_internet(cfg["api_base"]) if wifi_configured else False
+    internet_ok = has_internet(cfg["api_base"], cfg["health_path"]) if wifi_configured else False
 
     if not wifi_configured or not internet_ok:
         session["pairing_err"] = "Trennen nicht möglich: kein Internet."
@@ -791,28 +1099,30 @@ def unpair():
         session["pairing_err"] = f"Trennen fehlgeschlagen: {e}"
         return redirect("/")
 
-    write_dog_id("DEMO")
-    clear_device_token()
+    update_config({"dog_id": "DEMO", "api_token": None})
     remove_state_path(FLAG_DOG)
     clear_pairing_state()
+    invalidate_pairing()
     remove_state_path(HEARTBEAT_STATE_PATH)
     session["pairing_msg"] = "Gerät wurde getrennt."
     return redirect("/")
 
 @app.route("/pairing/status")
 def pairing_status():
-    cfg = read_cfg()
-    wifi_configured = FLAG_WIFI.exists()
-    internet_ok = has_internet(cfg["api_base"]) if wifi_configured else False
-    if not wifi_configured:
-        return jsonify({"status": "no-wifi"})
-    if not internet_ok:
-        return jsonify({"status": "offline"})
-    try:
-        data = ensure_pairing(cfg)
-        return jsonify(data)
-    except Exception:
-        return jsonify({"status": "error"})
+    # ?since=<version> long-polls until the poller publishes a newer state;
+    # waiters are capped so open tabs cannot tie up every gunicorn thread,
+    # everyone else gets the current state immediately
+    since = request.args.get("since", type=int)
+    watch_pairing()
+    if since is not None and _pairing_waiters.acquire(blocking=False):
+        try:
+            version, state = pairing_snapshot(since, PAIRING_LONGPOLL_SEC)
+        finally:
+            _pairing_waiters.release()
+    else:
+        version, state = pairing_snapshot()
+    state["version"] = version
+    return jsonify(state)
 
 @app.route("/images/barksignal.png")
 def brand_image():
@@ -851,6 +1161,7 @@ def select_dog():
     dog_id = request.form.get("dog_id","").strip()
     write_dog_id(dog_id)
     FLAG_DOG.write_text("ok")
+    invalidate_pairing()
     session["dog_ok"] = f"DOG_ID gesetzt ✅ ({dog_id}). Detector startet automatisch."
     return redirect("/")
 
@@ -873,6 +1184,7 @@ def create_dog():
             return redirect("/")
         write_dog_id(dog_id)
         FLAG_DOG.write_text("ok")
+        invalidate_pairing()
         session["dog_ok"] = f"Hund angelegt ✅ DOG_ID={dog_id}"
     except Exception as e:
         session["login_err"] = str(e)
@@ -114,7 +114,7 @@ if [[ -z "${PREV_TARGET}" || ! -d "${PREV_TARGET}" ]]; then
   exit 1
 fi
 
-persist=(config.ini .wifi_configured .dog_configured .configured .pairing_state.json .rescue yamnet.tflite)
+persist=(config.ini .wifi_configured .dog_configured .configured .pairing_state.json .rescue yamnet.tflite yamnet_class_map.csv)
 for f in "${persist[@]}"; do
   src="${PREV_TARGET}/${f}"
   dest="${DATA_DIR}/${f}"
@@ -158,6 +158,7 @@ rsync -a --delete \
   --exclude ".pairing_state.json" \
   --exclude ".rescue" \
   --exclude "yamnet.tflite" \
+  --exclude "yamnet_class_map.csv" \
   "${REPO_DIR}/" "${NEW_RELEASE}/"
 
 for f in "${persist[@]}"; do
@@ -179,6 +180,10 @@ if [[ ! -f "${DATA_DIR}/yamnet.tflite" ]]; then
   log "download yamnet.tflite"
   sudo -u barksignal curl -fL "https://storage.googleapis.com/audioset/yamnet.tflite" -o "${DATA_DIR}/yamnet.tflite"
 fi
+if [[ ! -f "${DATA_DIR}/yamnet_class_map.csv" ]]; then
+  log "download yamnet_class_map.csv"
+  sudo -u barksignal curl -fL "https://raw.githubusercontent.com/tensorflow/models/master/research/audioset/yamnet/yamnet_class_map.csv" -o "${DATA_DIR}/yamnet_class_map.csv" || true
+fi
 
 # update system scripts
 install -m 0755 "${REPO_DIR}/scripts/barksignal-guard.sh" /usr/local/sbin/barksignal-guard.sh